@@ -21,14 +21,16 @@ class SugarAgent(CellAgent):
         self.sugar = sugar
         self.metabolism = metabolism
         self.vision = vision
-    ## Define movement action
-    def move(self):
+    ## Define movement action; key is the agent's keyed draw for this step with draws="keyed"
+    def move(self, key=None):
         ## Determine currently empty cells within line of sight
         possibles = [
             cell
             for cell in self.cell.get_neighborhood(self.vision, include_center=True)
             if cell.is_empty 
         ]
+        if not possibles: # boxed in by other agents, stay put
+            return
         ## Determine how much sugar is in each possible movement target
         sugar_values = [
             cell.sugar
@@ -56,12 +58,17 @@ class SugarAgent(CellAgent):
             if math.isclose(get_distance(self.cell, cell), min_dist, rel_tol=1e-02)
         ]
         ## Choose one of the closest cells with maximum sugar (randomly if more than one)
-        self.cell = self.random.choice(final_candidates)
+        if key is None:
+            self.cell = self.random.choice(final_candidates)
+        else:
+            self.cell = final_candidates[int(key * len(final_candidates))]
     ## consume sugar in current cell, depleting it, then consume metabolism
     def gather_and_eat(self):
         self.sugar += self.cell.sugar
         self.cell.sugar = 0
         self.sugar -= self.metabolism
+        if self.model.regrowth is not None and not self.model.ag_enabled: # tell in-place regrowth this cell changed
+            self.model.regrowth.mark(*self.cell.coordinate)
     ## agents with a surplus of sugar plant it in the cell they occupy
     def plant_sugar(self):
         to_plant = self.sugar - self.metabolism # surplus is more sugar than agent needs to survive
@@ -70,6 +77,8 @@ class SugarAgent(CellAgent):
             self.sugar -= to_plant # ... and removing it from agent's sugar holdings
             x, y = self.cell.coordinate # get cell coordinate so it can be marked as planted
             self.model.grid.planted.data[x,y] = True # mark cell as planted; permanent effect for rest of simulation
+            if self.model.regrowth is not None:
+                self.model.regrowth.mark(x, y)
     ## If an agent has zero or negative sugar, it dies and is removed from the model
     def see_if_die(self):
         if self.sugar <= 0:
@@ -3,6 +3,12 @@
 from model import SugarScapeModel
 from mesa.visualization import Slider, SolaraViz, make_plot_component
 from mesa.visualization.components.matplotlib_components import make_mpl_space_component
+from raster import make_raster_component
+
+## Draw the map as one raster image instead of per-agent markers (much faster on big maps),
+## redrawing every FRAME_SKIP steps; set RASTER = False for the original marker plot
+RASTER = True
+FRAME_SKIP = 1
 
 ## Define agent portrayal (color, size, shape)
 def agent_portrayal(agent):
@@ -20,7 +26,7 @@ propertylayer_portrayal = {
 }
 
 ## Define model space component based on above
-sugarscape_space = make_mpl_space_component(
+sugarscape_space = make_raster_component(frame_skip=FRAME_SKIP) if RASTER else make_mpl_space_component(
     agent_portrayal=agent_portrayal,
     propertylayer_portrayal=propertylayer_portrayal,
     post_process=None,
@@ -4,6 +4,13 @@ from pathlib import Path
 import numpy as np
 import mesa
 from agents import SugarAgent
+from movement import VectorizedMovement
+from store import AgentStore
+from population import PopulationStats
+from sugarmap import DEFAULT_MAP, load_sugar_map, read_only
+from regrowth import Regrowth
+from streams import RandomStreams, keyed_population
+from profiling import NULL_PROFILER, StepProfiler
 
 ## Using experimental cell space for this model that enforces von Neumann neighborhoods
 from mesa.experimental.cell_space import OrthogonalVonNeumannGrid
@@ -13,25 +20,21 @@ from mesa.experimental.cell_space.property_layer import PropertyLayer
 class SugarScapeModel(mesa.Model):
     ## Helper function to calculate Gini coefficient, used in plot
     def calc_gini(self):
-        agent_sugars = [a.sugar for a in self.agents]
-        sorted_sugars = sorted(agent_sugars)
-        n = len(sorted_sugars)
-        x = sum(el * (n - ind) for ind, el in enumerate(sorted_sugars)) / (n * sum(sorted_sugars))
-        return 1 + (1 / n) - 2 * x
+        return self.stats.values()["Gini"]
     ## Helper function to count total agents, used in plot
     def agent_count(self):
-        agents = [a for a in self.agents]
-        return len(agents)
+        return self.stats.values()["NumAgents"]
     ## Helper function to calc average sugar, used in plot
     def mean_sugar(self):
-        agent_sugars = [a.sugar for a in self.agents]
-        return np.mean(agent_sugars)
+        return self.stats.values()["Sugar"]
     ## Helper function to calc average metabolism, used in plot
     def mean_metabolism(self):
-        agent_mets = np.array([a.metabolism for a in self.agents])
-        return np.mean(agent_mets)
+        return self.stats.values()["Metabolism"]
     ## Helper function to determine sugar regrowth rules based on cell carrying capacity
     def regrow(self):
+        if self.regrowth is not None: # in-place modes, same rules without new arrays
+            self.regrowth.step()
+            return
         max_sugar = 4  # maximum sugar capacity of any cell
         sugar = self.grid.sugar.data # array of sugar levels in each cell
         planted = self.grid.planted.data # array of planted states in each cell
@@ -64,6 +67,14 @@ class SugarScapeModel(mesa.Model):
         vision_max=5,
         seed = None,
         ag_enabled=True, # added variable to turn ag on/off
+        movement="agents", # "agents" uses SugarAgent.move, "vectorized" picks targets with numpy
+        phases="agents", # "agents" runs each phase per SugarAgent, "fused" keeps agents in an AgentStore
+        gini_mode="exact", # "exact" sorts every agent's sugar, "histogram" bins it in O(n) for big populations
+        sugar_map=None, # path to a .txt/.npy raster or a (width, height) array; None uses sugar-map.txt
+        regrow_mode="copy", # "copy" builds new arrays, "inplace" reuses them, "dirty" only visits changed cells
+        profile=False, # True times every phase of step, "allocations" also traces memory (slow)
+        draws="sequential", # "sequential" takes numbers from model.random/rng in execution order, "keyed"
+                            # derives each one from (seed, step, agent id), see streams.py
     ):
         self.ag_enabled = ag_enabled # initialize variable
         super().__init__(seed=seed)
@@ -76,16 +87,23 @@ class SugarScapeModel(mesa.Model):
         self.grid = OrthogonalVonNeumannGrid(
             (self.width, self.height), torus=False, random=self.random
         )
-        ## Define datacollector, which calculates current Gini coefficient
-        self.datacollector = mesa.DataCollector(
-            model_reporters = {"Gini": self.calc_gini, 
-                               "Metabolism": self.mean_metabolism, # added for plot
-                               "Sugar": self.mean_sugar, # added for plot
-                               "NumAgents": self.agent_count # added for plot
-                               }
-        )
+        if profile not in (False, True, "allocations"):
+            raise ValueError(f"unknown profile {profile!r}, expected False, True or 'allocations'")
+        if draws not in ("sequential", "keyed"):
+            raise ValueError(f"unknown draws {draws!r}, expected 'sequential' or 'keyed'")
+        self.streams = None
+        if draws == "keyed": # without a seed, pick one so the streams still have a key
+            self.streams = RandomStreams(self._seed if self._seed is not None else self.rng.integers(2**63))
+        self.setup_reporting(gini_mode, profile)
         ## Import sugar distribution from raster, define grid property
-        self.sugar_distribution = np.genfromtxt(Path(__file__).parent / "sugar-map.txt")
+        ## (parsed once per process and shared read-only, the sugar layer gets its own copy)
+        if sugar_map is None or isinstance(sugar_map, (str, Path)):
+            self.sugar_distribution = load_sugar_map(sugar_map or DEFAULT_MAP)
+        else:
+            self.sugar_distribution = read_only(sugar_map) # e.g. sugarmap.procedural_map(...)
+        if self.sugar_distribution.shape != (self.width, self.height):
+            raise ValueError(f"sugar map has shape {self.sugar_distribution.shape}, "
+                             f"expected (width, height) = {(self.width, self.height)}")
         self.grid.add_property_layer(
             PropertyLayer.from_data("sugar", self.sugar_distribution)
         )
@@ -94,30 +112,134 @@ class SugarScapeModel(mesa.Model):
         self.grid.add_property_layer(
             PropertyLayer.from_data("planted", planted_map)
             )
+        ## Choose how sugar regrows; all three modes give the same layers
+        if regrow_mode not in ("copy", "inplace", "dirty"):
+            raise ValueError(f"unknown regrow_mode {regrow_mode!r}, expected 'copy', 'inplace' or 'dirty'")
+        self.regrowth = None if regrow_mode == "copy" else Regrowth(self, dirty=regrow_mode == "dirty")
         ## Create agents, give them random properties, and place them randomly on the map
-        SugarAgent.create_agents(
-            self,
-            initial_population,
-            self.random.choices(self.grid.all_cells.cells, k=initial_population),
-            sugar=self.rng.integers(
-                endowment_min, endowment_max, (initial_population,), endpoint=True
-            ),
-            metabolism=self.rng.integers(
-                metabolism_min, metabolism_max, (initial_population,), endpoint=True
-            ),
-            vision=self.rng.integers(
-                vision_min, vision_max, (initial_population,), endpoint=True
-            ),
-        )
+        if phases not in ("agents", "fused"):
+            raise ValueError(f"unknown phases {phases!r}, expected 'agents' or 'fused'")
+        if self.streams is None:
+            cells = self.random.choices(self.grid.all_cells.cells, k=initial_population)
+            sugar = self.rng.integers(endowment_min, endowment_max, (initial_population,), endpoint=True)
+            metabolism = self.rng.integers(metabolism_min, metabolism_max, (initial_population,), endpoint=True)
+            vision = self.rng.integers(vision_min, vision_max, (initial_population,), endpoint=True)
+        else: ## keyed by agent id, so the SugarAgents and the AgentStore start out the same
+            flat, sugar, metabolism, vision = keyed_population(
+                self.streams, initial_population, self.width, self.height,
+                (endowment_min, endowment_max), (metabolism_min, metabolism_max), (vision_min, vision_max))
+            cells = [self.grid[divmod(cell, self.height)] for cell in flat.tolist()]
+        self.store = None
+        if phases == "fused":
+            ## no SugarAgent objects: the population lives in numpy columns
+            x, y = np.array([cell.coordinate for cell in cells], dtype=np.int64).reshape(-1, 2).T
+            self.store = AgentStore(sugar, metabolism, vision, x, y, height=self.height)
+            movement = "vectorized" # the store is only understood by the vectorized movement
+        else:
+            SugarAgent.create_agents(self, initial_population, cells,
+                                     sugar=sugar, metabolism=metabolism, vision=vision)
+        ## Choose movement engine; both give the same moves for the same seed
+        if movement not in ("agents", "vectorized"):
+            raise ValueError(f"unknown movement {movement!r}, expected 'agents' or 'vectorized'")
+        self.mover = VectorizedMovement(self) if movement == "vectorized" else None
         ## Initialize datacollector
         self.datacollector.collect(self)
+    ## Reporters, optional profiler and datacollector; also used by snapshot.load_snapshot to
+    ## rebuild a model without running __init__
+    def setup_reporting(self, gini_mode="exact", profile=False):
+        ## All four reporters come from one pass over the agents' sugar and metabolism
+        self.stats = PopulationStats(self, gini=gini_mode)
+        ## Optional per-phase timing, off by default
+        self.profiler = NULL_PROFILER
+        profile_reporters = {}
+        if profile:
+            timed = ["regrow", "move", "gather_and_eat"] + (["plant_sugar"] if self.ag_enabled else []) + ["see_if_die"]
+            self.profiler = StepProfiler(timed, allocations=profile == "allocations")
+            profile_reporters = self.profiler.model_reporters()
+        ## Define datacollector, which calculates current Gini coefficient
+        self.datacollector = mesa.DataCollector(
+            model_reporters = {"Gini": self.calc_gini, 
+                               "Metabolism": self.mean_metabolism, # added for plot
+                               "Sugar": self.mean_sugar, # added for plot
+                               "NumAgents": self.agent_count, # added for plot
+                               **profile_reporters # extra timing columns when profiling
+                               }
+        )
     ## Define step in simulation
     def step(self):
-        self.regrow() # sugar regrows at rates determined in regrow function
-        self.agents.shuffle_do("move") # agents move to cell with max sugar in field of vision
-        self.agents.shuffle_do("gather_and_eat") # agents eat, depleting cell's sugar to zero
-        if self.ag_enabled: # running model without ag is effectively the same as running base model
-            self.agents.shuffle_do("plant_sugar") # agents plant if they have surplus sugar
-        self.agents.shuffle_do("see_if_die") # agents with 0 sugar die
-        
-        self.datacollector.collect(self) # collect data for step
\ No newline at end of file
+        profiler = self.profiler # phases are timed only when the model was created with profile=True
+        profiler.start_step()
+        with profiler.phase("regrow"):
+            self.regrow() # sugar regrows at rates determined in regrow function
+        if self.store is not None:
+            self.fused_step()
+        elif self.streams is not None:
+            self.keyed_step()
+        else:
+            with profiler.phase("move", len(self.agents)):
+                if self.mover is not None:
+                    self.mover.start_phase()
+                    self.agents.shuffle_do(self.mover.move) # same shuffle, numpy target selection
+                else:
+                    self.agents.shuffle_do("move") # agents move to cell with max sugar in field of vision
+            with profiler.phase("gather_and_eat", len(self.agents)):
+                self.agents.shuffle_do("gather_and_eat") # agents eat, depleting cell's sugar to zero
+            if self.ag_enabled: # running model without ag is effectively the same as running base model
+                with profiler.phase("plant_sugar", len(self.agents)):
+                    self.agents.shuffle_do("plant_sugar") # agents plant if they have surplus sugar
+            with profiler.phase("see_if_die", len(self.agents)):
+                self.agents.shuffle_do("see_if_die") # agents with 0 sugar die
+        profiler.end_step()
+        with profiler.phase("collect"):
+            self.datacollector.collect(self) # collect data for step
+    ## Same phases as step with draws="keyed": agents move and eat in orders keyed by their ids
+    ## instead of shuffles, and planting and dying (which don't depend on order) run unshuffled
+    def keyed_step(self):
+        profiler = self.profiler
+        agents = list(self.agents)
+        ids = [agent.unique_id for agent in agents]
+        with profiler.phase("move", len(agents)):
+            keys = self.streams.uniform(self.steps, ids, "move").tolist()
+            if self.mover is not None:
+                self.mover.start_phase()
+            for i in self.streams.order(self.steps, ids, "order").tolist():
+                if self.mover is not None:
+                    self.mover.move(agents[i], keys[i])
+                else:
+                    agents[i].move(keys[i])
+        with profiler.phase("gather_and_eat", len(agents)):
+            for i in self.streams.order(self.steps, ids, "eat").tolist():
+                agents[i].gather_and_eat()
+        if self.ag_enabled:
+            with profiler.phase("plant_sugar", len(agents)):
+                self.agents.do("plant_sugar")
+        with profiler.phase("see_if_die", len(agents)):
+            self.agents.do("see_if_die")
+    ## Same phases as step, run on the AgentStore: movement is still one agent at a time in
+    ## shuffled order, the other three phases are single array operations with no reshuffling
+    def fused_step(self):
+        profiler = self.profiler
+        with profiler.phase("move", len(self.store)):
+            self.mover.start_phase()
+            if self.streams is None:
+                order = list(range(len(self.store))) # rows are in creation order, like the agent set
+                self.random.shuffle(order)
+                for i in order:
+                    self.mover.move_row(i)
+            else: # same keyed orders and draws as keyed_step
+                ids = self.store.unique_id
+                keys = self.streams.uniform(self.steps, ids, "move").tolist()
+                for i in self.streams.order(self.steps, ids, "order").tolist():
+                    self.mover.move_row(i, keys[i])
+        with profiler.phase("gather_and_eat", len(self.store)):
+            order = None if self.streams is None else self.streams.order(self.steps, self.store.unique_id, "eat")
+            eaten = self.store.gather_and_eat(self.grid.sugar.data, self.rng, order)
+            if self.regrowth is not None and not self.ag_enabled: # with ag only planted cells regrow
+                self.regrowth.mark_cells(eaten)
+        if self.ag_enabled:
+            with profiler.phase("plant_sugar", len(self.store)):
+                planted = self.store.plant_sugar(self.grid.sugar.data, self.grid.planted.data)
+                if self.regrowth is not None:
+                    self.regrowth.mark_cells(planted)
+        with profiler.phase("see_if_die", len(self.store)):
+            self.store.see_if_die()
\ No newline at end of file
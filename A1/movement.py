@@ -0,0 +1,99 @@
+from functools import lru_cache
+import numpy as np
+
+## Order the grid connects each cell to its von Neumann neighbors in
+DIRECTIONS = [(-1, 0), (0, -1), (0, 1), (1, 0)]
+
+## Helper to list every cell in sight of (x, y), in the same order cell.get_neighborhood does.
+## The grid builds a radius-r neighborhood by merging the radius-(r-1) neighborhoods of each
+## neighbor in turn, so we repeat that walk; pass width/height to clip it at the map edge
+@lru_cache(maxsize=None)
+def sight_order(x, y, vision, width=None, height=None):
+    def inside(cx, cy):
+        return width is None or (0 <= cx < width and 0 <= cy < height)
+    neighbors = [(x + dx, y + dy) for dx, dy in DIRECTIONS if inside(x + dx, y + dy)]
+    if vision == 1:
+        return tuple(neighbors + [(x, y)])
+    seen = {}
+    for nx, ny in neighbors:
+        seen.update(dict.fromkeys(sight_order(nx, ny, vision - 1, width, height)))
+    return tuple(seen)
+
+## Precomputed table for one vision radius: flat-index offsets (x * height + y) in neighborhood
+## order plus euclidean distances
+@lru_cache(maxsize=None)
+def sight_table(vision, height):
+    offsets = np.array(sight_order(0, 0, vision), dtype=np.int64)
+    return offsets[:, 0] * height + offsets[:, 1], np.sqrt((offsets ** 2).sum(axis=1))
+
+class VectorizedMovement:
+    ## Array version of SugarAgent.move. Agents still move one at a time in shuffled order, but
+    ## each one picks its target with numpy from grid.sugar.data and an occupancy array instead
+    ## of walking cells. Candidates are listed in the grid's own order, so seeded runs make the
+    ## same choices as SugarAgent.move
+    def __init__(self, model):
+        self.model = model
+        self.width, self.height = model.grid.dimensions
+        self.occupied = np.zeros(model.grid.dimensions, dtype=np.int64) # agents per cell (starts can be shared)
+        self.edge_tables = {} # (x, y, vision) -> clipped table for cells near the map edge
+
+    ## Flat ids and distances of the cells in sight of (x, y), clipped at the map edge
+    def cells_in_sight(self, x, y, vision):
+        offsets, distances = sight_table(vision, self.height)
+        if vision <= x < self.width - vision and vision <= y < self.height - vision:
+            return offsets + (x * self.height + y), distances # far from the edge, use the table as is
+        key = (x, y, vision)
+        if key not in self.edge_tables:
+            coords = np.array(sight_order(x, y, vision, self.width, self.height), dtype=np.int64)
+            self.edge_tables[key] = (coords[:, 0] * self.height + coords[:, 1],
+                                     np.sqrt(((coords - (x, y)) ** 2).sum(axis=1)))
+        return self.edge_tables[key]
+
+    ## Mark where every agent is before the movement phase starts
+    def start_phase(self):
+        self.occupied[:] = 0
+        self.occupied_flat = self.occupied.reshape(-1) # view, indexed by flat cell id
+        if self.model.store is not None:
+            np.add.at(self.occupied_flat, self.model.store.cells(), 1)
+        else:
+            for agent in self.model.agents:
+                self.occupied[agent.cell.coordinate] += 1
+
+    ## Same rule as SugarAgent.move: the empty cell with most sugar in sight, closest first.
+    ## Returns the flat id of the chosen cell, or None if every cell in sight is taken. key is the
+    ## agent's keyed draw for breaking ties with draws="keyed"
+    def choose(self, x, y, vision, key=None):
+        cells, distances = self.cells_in_sight(x, y, vision)
+        empty = self.occupied_flat[cells] == 0
+        cells, distances = cells[empty], distances[empty]
+        if not len(cells): # boxed in by other agents, stay put
+            return None
+        sugar = self.model.grid.sugar.data.reshape(-1)[cells]
+        max_sugar = sugar.max()
+        ## same closeness tests as math.isclose in SugarAgent.move
+        best = np.abs(sugar - max_sugar) <= 1e-9 * np.maximum(np.abs(sugar), abs(max_sugar))
+        cells, distances = cells[best], distances[best]
+        min_dist = distances.min()
+        final = cells[np.abs(distances - min_dist) <= 1e-2 * np.maximum(distances, min_dist)]
+        if key is None:
+            ## draw exactly like random.choice(final_candidates) so the random stream is unchanged
+            target = int(final[self.model.random.choice(range(len(final)))])
+        else:
+            target = int(final[int(key * len(final))]) # same pick as SugarAgent.move
+        self.occupied_flat[x * self.height + y] -= 1
+        self.occupied_flat[target] += 1
+        return target
+
+    ## Move one SugarAgent
+    def move(self, agent, key=None):
+        x, y = agent.cell.coordinate
+        target = self.choose(x, y, agent.vision, key)
+        if target is not None:
+            agent.cell = self.model.grid[divmod(target, self.height)]
+
+    ## Move one row of the model's AgentStore
+    def move_row(self, i, key=None):
+        store = self.model.store
+        target = self.choose(int(store.x[i]), int(store.y[i]), int(store.vision[i]), key)
+        if target is not None:
+            store.x[i], store.y[i] = divmod(target, self.height)
@@ -0,0 +1,8 @@
+from shared import load
+
+## The step profiler is shared with final_project and lives in tools/step_profiler.py
+_profiler = load("step_profiler")
+NULL_PROFILER = _profiler.NULL_PROFILER
+NullProfiler = _profiler.NullProfiler
+ProfileSummary = _profiler.ProfileSummary
+StepProfiler = _profiler.StepProfiler
@@ -0,0 +1,56 @@
+import numpy as np
+import solara
+from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.figure import Figure
+from mesa.visualization.utils import update_counter
+
+## Raster space component for app.py. The sugar layer is drawn as one imshow (white to yellow,
+## 0 to 4 sugar, like the old property layer portrayal) and the agents as a second image of red
+## pixels on top, built from grid.sugar.data and the agents' cells (or the AgentStore columns)
+## instead of one matplotlib marker per agent. frame_skip redraws only every n-th step, and maps
+## wider than max_side cells are decimated to every k-th cell before drawing
+
+SUGAR_COLORS = LinearSegmentedColormap.from_list("sugar", ["white", "yellow"])
+AGENT_COLOR = (1.0, 0.0, 0.0, 1.0) # red, fully opaque
+
+## Helper to get every agent's cell as x and y arrays
+def agent_cells(model):
+    if model.store is not None:
+        return model.store.x, model.store.y
+    coordinates = np.array([a.cell.coordinate for a in model.agents], dtype=np.int64).reshape(-1, 2)
+    return coordinates[:, 0], coordinates[:, 1]
+
+## (height, width) sugar image and (height, width, 4) agent overlay, rows are y so
+## imshow(origin="lower") matches the grid
+def sugarscape_images(model, stride=1):
+    sugar = model.grid.sugar.data[::stride, ::stride]
+    overlay = np.zeros(sugar.shape + (4,)) # transparent where there is no agent
+    x, y = agent_cells(model)
+    overlay[x // stride, y // stride] = AGENT_COLOR
+    return sugar.T, overlay.swapaxes(0, 1)
+
+def make_raster_component(frame_skip=1, max_side=400):
+    def MakeRasterSpace(model):
+        return RasterSpace(model, frame_skip=frame_skip, max_side=max_side)
+    return MakeRasterSpace
+
+@solara.component
+def RasterSpace(model, frame_skip=1, max_side=400):
+    update_counter.get()
+    frame = model.steps // frame_skip # unchanged between redraws, so nothing is re-rendered
+    stride = max(1, -(-max(model.width, model.height) // max_side))
+
+    def draw():
+        sugar, overlay = sugarscape_images(model, stride)
+        extent = (-0.5, model.width - 0.5, -0.5, model.height - 0.5)
+        fig = Figure()
+        ax = fig.add_subplot()
+        image = ax.imshow(sugar, cmap=SUGAR_COLORS, vmin=0, vmax=4, alpha=0.8, origin="lower",
+                          interpolation="nearest", extent=extent)
+        ax.imshow(overlay, origin="lower", interpolation="nearest", extent=extent)
+        fig.colorbar(image, ax=ax)
+        ax.set_axis_off()
+        return fig
+
+    fig = solara.use_memo(draw, dependencies=[model, frame])
+    solara.FigureMatplotlib(fig, format="png", bbox_inches="tight", dependencies=[model, frame])
@@ -0,0 +1,69 @@
+import numpy as np
+
+class Regrowth:
+    ## In-place version of SugarScapeModel.regrow, used when the model is created with
+    ## regrow_mode="inplace" or "dirty". The sugar layer is updated through out= ufuncs and one
+    ## preallocated mask instead of building new arrays every step, so grid.sugar.data keeps its
+    ## identity. With dirty=True only an active set of cells is touched: cells below their cap
+    ## (without agriculture), planted cells (with agriculture), and cells marked by
+    ## gather_and_eat / plant_sugar since the last step. The rules are the same as regrow, so
+    ## both modes give exactly the same layers
+    def __init__(self, model, dirty=False, max_sugar=4): # same cap as SugarScapeModel.regrow
+        self.model = model
+        self.dirty = dirty
+        self.max_sugar = max_sugar
+        self.capacity = model.sugar_distribution
+        self.height = self.capacity.shape[1]
+        self.mask = np.empty(self.capacity.shape, dtype=bool) # scratch buffer, reused every step
+        if dirty:
+            ## any cell regrow could change before agents have touched anything
+            sugar = model.grid.sugar.data
+            start = model.grid.planted.data | (sugar > self.max_sugar)
+            if not model.ag_enabled:
+                start |= (sugar < self.capacity) | (self.capacity > self.max_sugar)
+            self.pending = [] # flat ids marked one at a time during the step
+            self.pending_cells = [np.flatnonzero(start)] # arrays of flat ids: the active set plus marks
+
+    ## Mark one cell (by coordinate) as changed, called by agents that eat or plant
+    def mark(self, x, y):
+        if self.dirty:
+            self.pending.append(x * self.height + y)
+
+    ## Mark many cells (by flat id) as changed, called with the AgentStore's eaten/planted cells
+    def mark_cells(self, cells):
+        if self.dirty:
+            self.pending_cells.append(cells)
+
+    def step(self):
+        if self.dirty:
+            self.step_dirty()
+            return
+        sugar = self.model.grid.sugar.data
+        if not self.model.ag_enabled: # same regrowth mechanism as original when agriculture not enabled
+            np.add(sugar, 1, out=sugar)
+            np.minimum(sugar, self.capacity, out=sugar)
+        np.add(sugar, self.model.grid.planted.data, out=sugar) # planted cells get the bonus sugar
+        np.greater(sugar, self.max_sugar, out=self.mask) # over-farmed cells become barren
+        np.copyto(sugar, 0, where=self.mask)
+
+    ## Same rules as step, applied to the active cells only
+    def step_dirty(self):
+        if self.pending:
+            self.pending_cells.append(np.fromiter(self.pending, dtype=np.intp, count=len(self.pending)))
+            self.pending.clear()
+        cells = np.unique(np.concatenate(self.pending_cells))
+        sugar = self.model.grid.sugar.data.reshape(-1) # view, so writes land in the layer
+        planted = self.model.grid.planted.data.reshape(-1)[cells]
+        values = sugar[cells]
+        if not self.model.ag_enabled:
+            values = np.minimum(values + 1, self.capacity.reshape(-1)[cells])
+        values += planted
+        values[values > self.max_sugar] = 0
+        sugar[cells] = values
+        ## keep cells that will change again: planted ones, and without agriculture the ones still
+        ## below their cap (or above the barren limit, which cycle forever)
+        keep = planted
+        if not self.model.ag_enabled:
+            capacity = self.capacity.reshape(-1)[cells]
+            keep = keep | (values < capacity) | (capacity > self.max_sugar)
+        self.pending_cells = [cells[keep]]
@@ -0,0 +1,133 @@
+import io
+import json
+import numpy as np
+from mesa import Model
+from mesa.experimental.cell_space import OrthogonalVonNeumannGrid
+from mesa.experimental.cell_space.property_layer import PropertyLayer
+from agents import SugarAgent
+from model import SugarScapeModel
+from movement import VectorizedMovement
+from regrowth import Regrowth
+from store import AgentStore
+from streams import RandomStreams
+from sugarmap import read_only
+
+## Snapshots of a SugarScapeModel between steps, for pausing a long agriculture run, resuming
+## it later or branching several what-if runs off one warmed-up state. A snapshot is one .npz
+## file holding the sugar, planted and capacity layers, every agent's sugar, metabolism, vision
+## and cell (from the SugarAgents or the AgentStore), the dirty-cell set of in-place regrowth,
+## and a JSON header with the settings, random generator states (and the keyed streams' seed)
+## and the DataCollector rows.
+## load_snapshot rebuilds the model without SugarScapeModel.__init__, so no agents are drawn
+## again and the restored run carries on exactly where the saved one was:
+##     save_snapshot(model, "season1.npz")
+##     branch = load_snapshot("season1.npz"); branch.ag_enabled = False; branch.step()
+##     copy = fork(model) # same thing in memory
+
+VERSION = 1
+AGENT_COLUMNS = AgentStore.COLUMNS # sugar, metabolism, vision, x, y, unique_id
+
+## Helper to turn numpy scalars into values json can store
+def plain(value):
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    return value
+
+## Write the model's state to path (a filename or a binary file object). tail keeps only the
+## last `tail` DataCollector rows instead of the whole history
+def save_snapshot(model, path, tail=None, compress=False):
+    arrays = {
+        "sugar": model.grid.sugar.data,
+        "planted": model.grid.planted.data,
+        "capacity": model.sugar_distribution,
+    }
+    if model.store is not None:
+        for name in AGENT_COLUMNS:
+            arrays[f"agent_{name}"] = getattr(model.store, name)
+    else:
+        agents = list(model.agents) # creation order, which is the order shuffles start from
+        arrays["agent_sugar"] = np.array([a.sugar for a in agents], dtype=np.float64)
+        arrays["agent_metabolism"] = np.array([a.metabolism for a in agents], dtype=np.int64)
+        arrays["agent_vision"] = np.array([a.vision for a in agents], dtype=np.int64)
+        coordinates = np.array([a.cell.coordinate for a in agents], dtype=np.int64).reshape(-1, 2)
+        arrays["agent_x"], arrays["agent_y"] = coordinates.T
+        arrays["agent_unique_id"] = np.array([a.unique_id for a in agents], dtype=np.int64)
+    regrow_mode = "copy"
+    if model.regrowth is not None:
+        regrow_mode = "dirty" if model.regrowth.dirty else "inplace"
+        if model.regrowth.dirty:
+            regrowth = model.regrowth
+            arrays["regrow_active"] = np.unique(np.concatenate(
+                regrowth.pending_cells + [np.array(regrowth.pending, dtype=np.intp)]))
+    rows = slice(-tail, None) if tail else slice(None)
+    header = {
+        "version": VERSION,
+        "width": model.width, "height": model.height,
+        "ag_enabled": model.ag_enabled,
+        "phases": "fused" if model.store is not None else "agents",
+        "movement": "vectorized" if model.mover is not None else "agents",
+        "gini_mode": model.stats.gini, "gini_bins": model.stats.bins,
+        "regrow_mode": regrow_mode,
+        "profile": ("allocations" if model.profiler.allocations else True) if model.profiler.enabled else False,
+        "steps": model.steps, "running": model.running, "seed": plain(model._seed),
+        "random_state": model.random.getstate(),
+        "rng_state": model.rng.bit_generator.state,
+        "streams_seed": None if model.streams is None else model.streams.seed, # draws="keyed"
+        "model_vars": {name: [plain(v) for v in values[rows]]
+                       for name, values in model.datacollector.model_vars.items()},
+    }
+    arrays["header"] = np.array(json.dumps(header))
+    (np.savez_compressed if compress else np.savez)(path, **arrays)
+
+## Rebuild a SugarScapeModel from a snapshot written by save_snapshot
+def load_snapshot(path):
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    header = json.loads(str(arrays.pop("header")))
+    if header["version"] != VERSION:
+        raise ValueError(f"unsupported snapshot version {header['version']}, expected {VERSION}")
+
+    model = SugarScapeModel.__new__(SugarScapeModel)
+    Model.__init__(model, seed=header["seed"]) # only mesa's bookkeeping, generators are restored below
+    model.ag_enabled = header["ag_enabled"]
+    model.width, model.height = header["width"], header["height"]
+    model.grid = OrthogonalVonNeumannGrid((model.width, model.height), torus=False, random=model.random)
+    model.setup_reporting(header["gini_mode"], header["profile"])
+    model.stats.bins = header["gini_bins"]
+    model.sugar_distribution = read_only(arrays["capacity"])
+    model.grid.add_property_layer(PropertyLayer.from_data("sugar", arrays["sugar"]))
+    model.grid.add_property_layer(PropertyLayer.from_data("planted", arrays["planted"]))
+    model.regrowth = None
+    if header["regrow_mode"] != "copy":
+        model.regrowth = Regrowth(model, dirty=header["regrow_mode"] == "dirty")
+        if model.regrowth.dirty:
+            model.regrowth.pending_cells = [arrays["regrow_active"]]
+
+    model.streams = None if header["streams_seed"] is None else RandomStreams(header["streams_seed"])
+    model.store = None
+    if header["phases"] == "fused":
+        model.store = AgentStore(**{name: arrays[f"agent_{name}"] for name in AGENT_COLUMNS}, height=model.height)
+    else:
+        columns = zip(*(arrays[f"agent_{name}"].tolist() for name in AGENT_COLUMNS))
+        for sugar, metabolism, vision, x, y, unique_id in columns:
+            agent = SugarAgent(model, model.grid[(x, y)], sugar=sugar, metabolism=metabolism, vision=vision)
+            agent.unique_id = unique_id
+    model.mover = VectorizedMovement(model) if header["movement"] == "vectorized" else None
+    for name, values in header["model_vars"].items():
+        model.datacollector.model_vars[name] = values
+
+    model.steps = header["steps"]
+    model.running = header["running"]
+    version, state, gauss = header["random_state"]
+    model.random.setstate((version, tuple(state), gauss))
+    model.rng.bit_generator.state = header["rng_state"]
+    return model
+
+## Independent copy of a model, through an in-memory snapshot
+def fork(model):
+    buffer = io.BytesIO()
+    save_snapshot(model, buffer)
+    buffer.seek(0)
+    return load_snapshot(buffer)
@@ -0,0 +1,57 @@
+import numpy as np
+
+class AgentStore:
+    ## Array-backed population used by SugarScapeModel(phases="fused"): one row per living agent,
+    ## with sugar, metabolism, vision, the x/y of its cell and its id (what mesa would have given
+    ## the SugarAgent, 1 ... n) kept as numpy columns in the order the agents were created.
+    ## gather_and_eat, plant_sugar and see_if_die run on every row at once
+    COLUMNS = ("sugar", "metabolism", "vision", "x", "y", "unique_id")
+
+    def __init__(self, sugar, metabolism, vision, x, y, height, unique_id=None):
+        self.sugar = np.asarray(sugar, dtype=np.float64)
+        self.metabolism = np.asarray(metabolism, dtype=np.int64)
+        self.vision = np.asarray(vision, dtype=np.int64)
+        self.x = np.asarray(x, dtype=np.int64)
+        self.y = np.asarray(y, dtype=np.int64)
+        self.unique_id = np.arange(1, len(self.sugar) + 1) if unique_id is None else np.asarray(unique_id, dtype=np.int64)
+        self.height = height # grid height, to turn (x, y) into a flat cell id
+
+    def __len__(self):
+        return len(self.sugar)
+
+    ## Flat id (x * height + y) of every agent's cell
+    def cells(self):
+        return self.x * self.height + self.y
+
+    ## Consume sugar in each agent's cell, depleting it, then consume metabolism.
+    ## Agents sharing a cell (possible from the random start) split it like the shuffled
+    ## per-agent phase does: a random one of them gets everything, the rest get nothing.
+    ## order is the eating order with draws="keyed", otherwise it is drawn from rng
+    def gather_and_eat(self, sugar_layer, rng, order=None):
+        cell_sugar = sugar_layer.reshape(-1) # view, so writes land in the layer
+        cells = self.cells()
+        if order is None:
+            order = rng.permutation(len(self))
+        _, first = np.unique(cells[order], return_index=True)
+        eaters = order[first]
+        self.sugar[eaters] += cell_sugar[cells[eaters]]
+        cell_sugar[cells[eaters]] = 0
+        self.sugar -= self.metabolism
+        return cells[eaters] # cells that were eaten, for dirty-cell regrowth
+
+    ## Agents with a surplus of sugar plant it in their cell, which becomes planted for good
+    def plant_sugar(self, sugar_layer, planted_layer):
+        to_plant = self.sugar - self.metabolism # surplus is more sugar than agent needs to survive
+        planting = to_plant > 0 # protecting the sugar-poor (agents only plant if it won't kill them)
+        cells = self.cells()[planting]
+        np.add.at(sugar_layer.reshape(-1), cells, to_plant[planting]) # several planters can share a cell
+        self.sugar[planting] -= to_plant[planting]
+        planted_layer.reshape(-1)[cells] = True
+        return cells
+
+    ## Agents with zero or negative sugar die; the survivors are compacted in one go
+    def see_if_die(self):
+        alive = self.sugar > 0
+        if not alive.all():
+            for name in self.COLUMNS:
+                setattr(self, name, getattr(self, name)[alive])
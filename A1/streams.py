@@ -0,0 +1,31 @@
+import numpy as np
+
+from shared import load
+
+## Counter-based random numbers for SugarScapeModel(draws="keyed"). Every number is a pure
+## function of (seed, step, agent id, purpose) instead of the next value of model.random, so an
+## agent's draw doesn't depend on how many agents drew before it or in what order they ran:
+## the agents, vectorized and fused paths all see the same numbers, and a run can be split up
+## without changing them. The Philox streams are shared with final_project
+## (tools/counter_streams.py); only the purposes below are this model's. Agent id i owns
+## position i of each (seed, purpose, step) stream
+##     streams = RandomStreams(seed)
+##     keys = streams.uniform(step, ids, "move") # one double in [0, 1) per id
+##     order = streams.order(step, ids, "order") # activation order of the agents in ids
+
+PURPOSES = {name: i for i, name in enumerate([
+    "place", "sugar", "metabolism", "vision", # set-up draws (step 0)
+    "order", "move", "eat", # per-step draws
+])}
+
+class RandomStreams(load("counter_streams").RandomStreams):
+    purposes = PURPOSES
+
+## SugarScapeModel set-up for ids 1 ... count (the ids mesa hands the SugarAgents): flat cell of
+## every agent (x * height + y, several agents can share one, like random.choices) and its
+## endowment, metabolism and vision
+def keyed_population(streams, count, width, height, endowment, metabolism, vision):
+    ids = np.arange(1, count + 1)
+    cells = streams.integers(0, ids, "place", 0, width * height - 1)
+    return (cells, streams.integers(0, ids, "sugar", *endowment),
+            streams.integers(0, ids, "metabolism", *metabolism), streams.integers(0, ids, "vision", *vision))
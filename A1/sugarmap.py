@@ -0,0 +1,65 @@
+import os
+from pathlib import Path
+import numpy as np
+
+## Sugar maps are parsed once per process and shared read-only between models. Each model
+## copies the map into its own sugar property layer (PropertyLayer.from_data copies), so the
+## shared array is only ever read (as the regrowth cap when agriculture is off)
+DEFAULT_MAP = Path(__file__).parent / "sugar-map.txt"
+
+_maps = {} # (path, mtime, size) -> read-only array
+
+## Load a sugar map from a text raster (like sugar-map.txt) or a .npy file, cached per process.
+## With sidecar=True (off by default, so building a model never writes into the source tree)
+## a text map is also saved next to itself as <name>.npy, which later processes memory-map
+## instead of parsing; the sidecar is rebuilt whenever the text is newer. Long sweeps can turn it
+## on by loading the map once per worker before building models, which then reuse that copy
+def load_sugar_map(path=DEFAULT_MAP, sidecar=False):
+    path = Path(path).resolve()
+    stat = path.stat()
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _maps:
+        for old in [k for k in _maps if k[0] == path]: # the file changed, drop the stale copy
+            del _maps[old]
+        if path.suffix == ".npy":
+            sugar = np.load(path, mmap_mode="r")
+        else:
+            sugar = _load_text(path, stat, sidecar)
+        _maps[key] = read_only(sugar)
+    return _maps[key]
+
+def _load_text(path, stat, sidecar):
+    npy = path.with_suffix(".npy")
+    if sidecar and npy.exists() and npy.stat().st_mtime_ns >= stat.st_mtime_ns:
+        return np.load(npy, mmap_mode="r")
+    sugar = np.genfromtxt(path)
+    if sidecar:
+        try:
+            tmp = npy.with_name(f".{npy.stem}.{os.getpid()}.npy")
+            np.save(tmp, sugar)
+            tmp.replace(npy) # atomic, so parallel workers never read half a sidecar
+        except OSError: # read-only checkout, keep the parsed copy in memory only
+            pass
+    return sugar
+
+## Helper to share an array between models without letting any of them write to it
+def read_only(sugar):
+    sugar = np.asarray(sugar, dtype=np.float64)
+    if sugar.ndim != 2:
+        raise ValueError(f"sugar map must be 2-d, got shape {sugar.shape}")
+    sugar = sugar.view() # don't change the flags of the caller's array
+    sugar.flags.writeable = False
+    return sugar
+
+## Procedural Sugarscape-like map: sugar peaks at random centres and falls off in rings,
+## max_sugar at each centre down to 0 at `radius` cells away (the larger peak wins where
+## they overlap). Handy for grids much larger than sugar-map.txt
+def procedural_map(width, height, peaks=2, max_sugar=4, radius=None, seed=None):
+    rng = np.random.default_rng(seed)
+    radius = radius or 0.4 * min(width, height)
+    x, y = np.meshgrid(np.arange(width), np.arange(height), indexing="ij")
+    sugar = np.zeros((width, height))
+    for cx, cy in rng.uniform((0, 0), (width, height), size=(peaks, 2)):
+        ring = max_sugar - np.floor(max_sugar * np.hypot(x - cx, y - cy) / radius) # (ceil would give -0.0)
+        np.maximum(sugar, np.clip(ring, 0, max_sugar), out=sugar)
+    return read_only(sugar)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model import SugarScapeModel
+from snapshot import fork, load_snapshot, save_snapshot
+from sugarmap import procedural_map
+
+## The faster modes of SugarScapeModel must give exactly the runs of the default one
+
+REPORTERS = ["Gini", "Metabolism", "Sugar", "NumAgents"]
+
+def run(steps=30, **params):
+    model = SugarScapeModel(**params)
+    for _ in range(steps):
+        model.step()
+    return model
+
+def reporters(model):
+    return model.datacollector.get_model_vars_dataframe()[REPORTERS].to_numpy()
+
+@pytest.mark.parametrize("ag_enabled", [True, False])
+@pytest.mark.parametrize("seed", [1, 7])
+def test_vectorized_movement_matches_agents(seed, ag_enabled):
+    agents = run(seed=seed, ag_enabled=ag_enabled)
+    vectorized = run(seed=seed, ag_enabled=ag_enabled, movement="vectorized")
+    assert np.array_equal(reporters(vectorized), reporters(agents))
+    assert np.array_equal(vectorized.grid.sugar.data, agents.grid.sugar.data)
+
+@pytest.mark.parametrize("phases", ["agents", "fused"])
+@pytest.mark.parametrize("ag_enabled", [True, False])
+def test_regrow_modes_match_copy(phases, ag_enabled):
+    sugar_map = procedural_map(60, 40, max_sugar=6, seed=5)
+    runs = [run(seed=2, width=60, height=40, sugar_map=sugar_map, initial_population=300, phases=phases,
+                ag_enabled=ag_enabled, regrow_mode=mode) for mode in ("copy", "inplace", "dirty")]
+    for model in runs[1:]:
+        assert np.array_equal(model.grid.sugar.data, runs[0].grid.sugar.data)
+        assert np.array_equal(model.grid.planted.data, runs[0].grid.planted.data)
+        assert np.array_equal(reporters(model), reporters(runs[0]))
+
+@pytest.mark.parametrize("ag_enabled", [True, False])
+def test_keyed_draws_match_across_paths(ag_enabled):
+    runs = [run(seed=3, ag_enabled=ag_enabled, initial_population=500, draws="keyed", **params)
+            for params in (dict(), dict(movement="vectorized"), dict(phases="fused"))]
+    for model in runs[1:]:
+        assert np.array_equal(reporters(model), reporters(runs[0]))
+
+@pytest.mark.parametrize("params", [
+    dict(), dict(draws="keyed", phases="fused"), dict(movement="vectorized", regrow_mode="dirty"),
+    dict(phases="fused", ag_enabled=False, gini_mode="histogram", regrow_mode="inplace"),
+])
+def test_snapshot_and_fork_continue_exactly(params, tmp_path):
+    model = run(15, seed=4, initial_population=300, **params)
+    save_snapshot(model, tmp_path / "model.npz")
+    copies = [load_snapshot(tmp_path / "model.npz"), fork(model)]
+    for copy in [model, *copies]:
+        for _ in range(15):
+            copy.step()
+    columns = [name for name in model.datacollector.model_vars if "Time" not in name]
+    frame = pd.DataFrame({name: model.datacollector.model_vars[name] for name in columns})
+    for copy in copies:
+        assert pd.DataFrame({name: copy.datacollector.model_vars[name] for name in columns}).equals(frame)
+        assert np.array_equal(copy.grid.sugar.data, model.grid.sugar.data)
@@ -1,12 +1,63 @@
+from array import array
+import numpy as np
 from mesa import Agent
+from spatial import MOORE_OFFSETS
+
+# moore slot of each (dx, dy) offset, used to index peer familiarity
+MOORE_SLOTS = {(int(dx), int(dy)): k for k, (dx, dy) in enumerate(MOORE_OFFSETS)}
+CITIZEN_ATTRIBUTES = ("susceptibility", "severity", "benefits", "barriers", "knowledge", "behavior")
+
+class CitizenTable:
+    # every citizen's health belief attributes, one array per attribute; citizen i owns row i.
+    # Citizens only keep their row instead of six float attributes each. Rows are stored in array.array buffers (fast scalar reads for the agents) and exposed
+    # as numpy views of the same memory, so reporters/snapshots can read whole arrays at once
+    def __init__(self, size):
+        for name in CITIZEN_ATTRIBUTES:
+            typecode, dtype = ("B", bool) if name == "behavior" else ("d", float)
+            rows = array(typecode, bytes(size * array(typecode).itemsize))
+            setattr(self, "_" + name, rows)
+            setattr(self, name, np.frombuffer(rows, dtype=dtype))
+        self.size = 0 # rows handed out so far
+
+    def add(self):
+        self.size += 1
+        return self.size - 1
+
+    def grid(self, name, width, height):
+        # (width, height) view of one attribute; rows are handed out x-major, one per cell
+        return getattr(self, name).reshape(width, height)
+
+class Column:
+    # citizen attribute stored in the citizen's row of the model's CitizenTable
+    def __set_name__(self, owner, name):
+        self.rows = "_" + name
+
+    def __get__(self, citizen, owner=None):
+        if citizen is None:
+            return self
+        return getattr(citizen.table, self.rows)[citizen.index]
+
+    def __set__(self, citizen, value):
+        getattr(citizen.table, self.rows)[citizen.index] = value
+
+class Flag(Column):
+    # bool attribute, stored as one byte per citizen
+    def __get__(self, citizen, owner=None):
+        if citizen is None:
+            return self
+        return bool(getattr(citizen.table, self.rows)[citizen.index])
 
 class Authority(Agent): # define authority class
-    def __init__(self, model, unique_id):
+    def __init__(self, model, unique_id, reliability=None):
         super().__init__(model)
-        self.reliability = model.random.uniform(-1, 1)
         self.unique_id = unique_id
-        low, high = model.reliability_range
-        self.reliability = model.random.uniform(low, high)
+        self.index = None # position in model.authority_index, set when placed
+        if reliability is None:
+            self.reliability = model.random.uniform(-1, 1)
+            low, high = model.reliability_range
+            self.reliability = model.random.uniform(low, high)
+        else: # already drawn by the model (draws="keyed")
+            self.reliability = reliability
 
     def move(self):
         # authority will randomly move to any spot in its moore neighborhood
@@ -17,100 +68,126 @@ class Authority(Agent): # define authority class
         ))
         self.model.random.shuffle(possible_steps)
         for step in possible_steps:
-            if all( # authority can move to any cell that isn't already occupied by an authority
-                not isinstance(a, Authority) 
-                for a in self.model.grid.get_cell_list_contents(step)
-            ):
+            # authority can move to any cell that isn't already occupied by an authority
+            if self.model.authority_index.is_free(step):
                 self.model.grid.move_agent(self, step)
+                self.model.authority_index.move(self.index, step) # keep occupancy layer in sync
                 break
 
     def behave(self): # same name as citizen behave for step function
         self.move()
 
 class Citizen(Agent): # define citizen class
+    # health belief attributes live in model.citizen_table, read and written like normal attributes
+    susceptibility = Column()
+    severity = Column()
+    benefits = Column()
+    barriers = Column()
+    knowledge = Column()
+    behavior = Flag()
+
     def __init__(self, model, unique_id):
         super().__init__(model)
+        self.table = model.citizen_table
+        self.index = self.table.add() # row in the table and in model.familiarity; citizens are created
+                                      # x-major, one per cell, so this is x * height + y
         self.unique_id = unique_id # give each agent an id so they can be identified in memory feature
-        self.susceptibility = model.random.uniform(-1, 1) # assign random float from -1 to 1 for all HB features
-        self.severity = model.random.uniform(-1, 1)
-        self.benefits = model.random.uniform(-1, 1)
-        self.barriers = model.random.uniform(-1, 1)
-        self.knowledge = model.random.uniform(-1, 1) # all agents start with some level of prior knowledge
-        self.behavior = self.knowledge > 0 # initializes based on knowledge at start
-        self.memory = {} # initialize empty memory dictionary
-        self.cached_neighbors = None
+        if model.streams is None: # with draws="keyed" the model fills the whole table at once
+            self.susceptibility = model.random.uniform(-1, 1) # assign random float from -1 to 1 for all HB features
+            self.severity = model.random.uniform(-1, 1)
+            self.benefits = model.random.uniform(-1, 1)
+            self.barriers = model.random.uniform(-1, 1)
+            self.knowledge = model.random.uniform(-1, 1) # all agents start with some level of prior knowledge
+            self.behavior = self.knowledge > 0 # initializes based on knowledge at start
+        self.cached_neighbors = None # familiarity lives in model.familiarity instead of a per-citizen dict
+        self.cached_cells = None
+
+    def slot_of(self, peer): # moore slot a neighboring peer occupies relative to this citizen
+        return MOORE_SLOTS[(peer.pos[0] - self.pos[0], peer.pos[1] - self.pos[1])]
+
+    def pick(self, neighbors):
+        # one neighbor at random; with draws="keyed" the one whose moore slot has the highest
+        # interaction key this step, the same rule the vectorized engine uses
+        if self.model.streams is None:
+            return self.model.random.choice(neighbors)
+        keys = self.model.interaction_keys[self.index]
+        return max(neighbors, key=lambda other: keys[self.slot_of(other)])
 
     def find_neighbors(self):
+        # peers never move, so they are looked up once and cached
+        if self.cached_neighbors is None:
+            neighbors = self.model.grid.get_neighbors(self.pos, moore=True, include_center=False)
+            self.cached_neighbors = [n for n in neighbors if isinstance(n, Citizen)]
+            self.cached_cells = self.model.authority_index.neighbor_cells(self.pos)
+        peers = self.cached_neighbors
+        # authorities are read off the model's occupancy layer instead of the grid
         if self.model.authority_density == 0:
-            # only compute once if authorities are not enabled to avoid redundancy
-            if self.cached_neighbors is None:
-                neighbors = self.model.grid.get_neighbors(self.pos, moore=True, include_center=False)
-                self.cached_neighbors = neighbors
-            neighbors = self.cached_neighbors
+            authorities = []
         else:
-            # calculate neighbors each step when authorities are enabled
-            neighbors = self.model.grid.get_neighbors(pos=self.pos, 
-                                                  moore=True, 
-                                                  include_center=False)
-        # split neighbors into authorities and peers
-        authorities = [n for n in neighbors if isinstance(n, Authority)]
-        peers = [n for n in neighbors if isinstance(n, Citizen)]
+            authorities = self.model.authority_index.agents_around(self.cached_cells)
         return authorities, peers
     
     def adjust_knowledge(self, authorities, peers):
+        # hot path: rows are read from the citizen table directly instead of through the attributes
+        table, row = self.table, self.index
+        knowledge = table._knowledge[row]
         # handles authority variable implicitly 
         if len(authorities) > 0:
-            authority = self.model.random.choice(authorities) # choose authority
-            self.memory[authority.unique_id] = self.memory.get(authority.unique_id, 0) + 1 # add authority to memory
-            familiarity = self.memory[authority.unique_id]
-            self.knowledge += authority.reliability * familiarity
+            authority = self.pick(authorities) # choose authority
+            familiarity = self.model.familiarity.bump_one(self.index, authority.unique_id) # add authority to memory
+            knowledge += authority.reliability * familiarity
             
         # handles peer interactions
         elif peers: ## add something to encourage agents to interact more frequently with interlocutors
-            interlocutor = self.model.random.choice(peers)
+            interlocutor = self.pick(peers)
             # add interlocutor to memory/increase strength of relationship
-            self.memory[interlocutor.unique_id] = self.memory.get(interlocutor.unique_id, 0) + 1
-            familiarity = self.memory[interlocutor.unique_id]
+            familiarity = self.model.familiarity.bump_peer(self.index, self.slot_of(interlocutor))
             # determine knowledge transfer
-            if interlocutor.knowledge < 0 and self.knowledge < 0:
-                self.knowledge -= 0.1 * familiarity
-            elif interlocutor.knowledge > 0 and self.knowledge > 0:
-                self.knowledge += 0.1 * familiarity
-            elif interlocutor.knowledge > 0 and self.knowledge < 0:
-                self.knowledge += 0.1 * familiarity
+            other = table._knowledge[interlocutor.index]
+            if other < 0 and knowledge < 0:
+                knowledge -= 0.1 * familiarity
+            elif other > 0 and knowledge > 0:
+                knowledge += 0.1 * familiarity
+            elif other > 0 and knowledge < 0:
+                knowledge += 0.1 * familiarity
             else:
-                self.knowledge -= 0.1 * familiarity
+                knowledge -= 0.1 * familiarity
 
-        return self.knowledge
+        table._knowledge[row] = knowledge
+        return knowledge
     
     def peer_pressure(self, peers):
         # calculate peer pressure cue to action based on neighbor behaviors
-        behaved = [n for n in peers if n.behavior == True]
-        not_behaved = [n for n in peers if n.behavior == False]
+        behavior = self.table._behavior # peers' rows read straight from the table
+        behaved = sum(behavior[n.index] for n in peers)
+        not_behaved = len(peers) - behaved
 
-        if len(not_behaved) > 0: # avoid div by zero error
-            return len(behaved) / len(not_behaved)
+        if not_behaved > 0: # avoid div by zero error
+            return behaved / not_behaved
         else:
-            return len(behaved) # doesn't matter that this math doesn't math since the threshold will be bigger than 1
+            return behaved # doesn't matter that this math doesn't math since the threshold will be bigger than 1
         
     def adjust_health_belief(self, peer_pressure):
+        # same rules as before on local copies, read from and written back to the citizen table once
+        table, row = self.table, self.index
+        knowledge = table._knowledge[row]
         # use peer pressure to influence benefits/barriers
-        self.benefits += 0.1 * (peer_pressure - 0.5)  # boost if > 0.5
-        self.barriers -= 0.1 * (peer_pressure - 0.5)  # reduce if < 0.5
-        self.benefits = max(-1, min(1, self.benefits)) # cap values
-        self.barriers = max(-1, min(1, self.barriers)) # cap values
+        benefits = table._benefits[row] + 0.1 * (peer_pressure - 0.5)  # boost if > 0.5
+        barriers = table._barriers[row] - 0.1 * (peer_pressure - 0.5)  # reduce if < 0.5
+        benefits = max(-1, min(1, benefits)) # cap values
+        barriers = max(-1, min(1, barriers)) # cap values
         # use knowledge to influence susceptibility/severity
-        self.susceptibility += 0.1 * self.knowledge
-        self.severity += 0.1 * self.knowledge
-        self.susceptibility = max(-1, min(1, self.susceptibility)) # cap values
-        self.severity = max(-1, min(1, self.severity)) # cap values
+        susceptibility = max(-1, min(1, table._susceptibility[row] + 0.1 * knowledge)) # cap values
+        severity = max(-1, min(1, table._severity[row] + 0.1 * knowledge)) # cap values
+        table._benefits[row], table._barriers[row] = benefits, barriers
+        table._susceptibility[row], table._severity[row] = susceptibility, severity
         # calculate the difference between the average of susc/severity and benefits/barriers 
-        return (self.susceptibility + self.severity)/2 - (self.benefits + self.barriers)/2
+        return (susceptibility + severity)/2 - (benefits + barriers)/2
     
     def behave(self): # change this so that all the steps happen in model?
         authorities, peers = self.find_neighbors()
-        self.knowledge = self.adjust_knowledge(authorities, peers)
+        self.adjust_knowledge(authorities, peers) # updates self.knowledge
         peer_pressure = self.peer_pressure(peers)
         hb = self.adjust_health_belief(peer_pressure)
         # check if agent satisfies conditions for behavior
-        self.behavior = hb > 0        
\ No newline at end of file
+        self.behavior = hb > 0
@@ -4,12 +4,18 @@ from agents import Citizen, Authority
 from model import CommunityModel
 from types import SimpleNamespace
 from mesa.visualization.components.matplotlib_components import make_mpl_space_component
+from raster import make_raster_component
 from mesa.visualization import (  
     SolaraViz,
     make_plot_component,
     Slider
     )
 
+# draw the grid as one raster image instead of a marker per agent (much faster on big grids),
+# redrawing every FRAME_SKIP steps; set RASTER = False for the original marker plot
+RASTER = True
+FRAME_SKIP = 1
+
 def agent_portrayal(agent):
     # combined functions to pass into community_space
     if isinstance(agent, Citizen):
@@ -31,7 +37,7 @@ def agent_portrayal(agent):
             'size': 5
         }
 
-community_space = make_mpl_space_component(
+community_space = make_raster_component(frame_skip=FRAME_SKIP) if RASTER else make_mpl_space_component(
     agent_portrayal=agent_portrayal, # single function instead of list of functions
     post_process=None,
     draw_grid=False,
@@ -0,0 +1,27 @@
+from collections import deque
+from reporters import REPORTERS
+
+class ConvergenceMonitor:
+    # watches reporter values step by step and flags convergence once every watched reporter
+    # has stayed within `tolerance` (max - min) over the last `window` steps
+    def __init__(self, reporters=("Mean Behavior", "Net Health Belief"), tolerance=1e-3, window=20):
+        unknown = set(reporters) - set(REPORTERS)
+        if unknown:
+            raise ValueError(f"unknown convergence reporters {sorted(unknown)}, expected some of {REPORTERS}")
+        if window < 2:
+            raise ValueError("convergence window must be at least 2 steps")
+        self.reporters = list(reporters)
+        self.tolerance = tolerance
+        self.window = window
+        self.history = deque(maxlen=window)
+        self.converged_at = None # step the window first closed, None while still changing
+
+    def update(self, step, values):
+        # record this step's values, returns True once converged
+        if self.converged_at is None:
+            self.history.append([values[name] for name in self.reporters])
+            if len(self.history) == self.window and all(
+                max(column) - min(column) <= self.tolerance for column in zip(*self.history)
+            ):
+                self.converged_at = step
+        return self.converged_at is not None
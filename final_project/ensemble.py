@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+from memory import FamiliarityStore
+from profiling import NULL_PROFILER
+from reporters import REPORTERS
+from spatial import MOORE_OFFSETS, StackedAuthorityIndex
+from streams import RandomStreams, keyed_authorities, keyed_citizens
+from vectorized import VectorizedEngine, movement_draws, neighbor_views
+
+# Ensemble of K independent CommunityModel replicas advanced in lock-step by one vectorized
+# engine. Citizen state is stacked on a leading replica axis (K, width, height), so every rule
+# in VectorizedEngine runs once for all replicas, and authorities of every replica move in one
+# pass over the stacked occupancy layer; only the random draws loop over replicas. Each replica
+# keeps its own generator seeded like CommunityModel(seed=...) and draws in the same order, so
+# replica k follows exactly the same trajectory as
+# CommunityModel(engine="vectorized", seed=seeds[k], ...) run on its own (with draws="keyed",
+# each replica gets its own RandomStreams instead, matching CommunityModel(draws="keyed")).
+# Replicas share the grid size, memory settings and authority movement; seeds, authority density
+# and the reliability range can differ per replica:
+#     ensemble = CommunityEnsemble(seeds=range(10), authority_density=0.1)
+#     ensemble.run(300)
+#     df = ensemble.to_frame() # one row per replica per step, like batch_run output
+
+def per_replica(value, count, name):
+    # a scalar applies to every replica, a sequence gives one value per replica
+    if isinstance(value, (list, tuple, range, np.ndarray)):
+        if len(value) != count:
+            raise ValueError(f"{name} has {len(value)} values for {count} replicas")
+        return list(value)
+    return [value] * count
+
+
+class EnsembleEngine(VectorizedEngine):
+    # VectorizedEngine with a leading replica axis; one generator per replica and one
+    # StackedAuthorityIndex for all of them
+    def __init__(self, ensemble):
+        self.model = ensemble
+        width, height = ensemble.width, ensemble.height
+        shape = (width, height)
+        self.rngs = [np.random.default_rng(run["seed"]) for run in ensemble.runs]
+        self.replica_streams = [None] * len(self.rngs)
+        if ensemble.draws == "keyed": # seeded like CommunityModel(draws="keyed")
+            self.replica_streams = [RandomStreams(run["seed"] if run["seed"] is not None else rng.integers(2**63))
+                                    for rng, run in zip(self.rngs, ensemble.runs)]
+
+        draws = np.stack([rng.uniform(-1, 1, size=(5,) + shape) if streams is None else keyed_citizens(streams, shape)
+                          for rng, streams in zip(self.rngs, self.replica_streams)], axis=1)
+        self.susceptibility, self.severity, self.benefits, self.barriers, self.knowledge = draws
+        self.behavior = self.knowledge > 0
+
+        # replica k's citizens are rows k * width * height ... of the shared familiarity store
+        self.memory = ensemble.familiarity
+        self.in_bounds = neighbor_views(np.ones(shape, dtype=bool), False) # broadcasts over replicas
+
+        positions = []
+        reliability = []
+        for rng, streams, run in zip(self.rngs, self.replica_streams, ensemble.runs):
+            num_authorities = int(run["authority_density"] * width * height)
+            low, high = run["reliability_min"], run["reliability_max"]
+            if streams is None:
+                cells = rng.permutation(width * height)[:num_authorities]
+            else:
+                cells, values = keyed_authorities(streams, width, height, num_authorities, low, high)
+            positions.append(np.stack(np.unravel_index(cells, shape), axis=-1))
+            reliability.append(rng.uniform(low, high, size=num_authorities) if streams is None else values)
+        # authorities are numbered across the ensemble: replica k's start at authorities.offsets[k]
+        self.authorities = StackedAuthorityIndex(width, height, positions)
+        self.authority_reliability = np.concatenate(reliability)
+
+    def move_authorities(self):
+        # each replica draws exactly what move_authorities would, then all of them move at once
+        movement = self.model.authority_movement
+        draws = [movement_draws(count, rng, movement, streams, self.model.steps)
+                 for count, rng, streams in zip(self.authorities.counts.tolist(), self.rngs, self.replica_streams)]
+        if movement == "batched":
+            keys = np.concatenate([keys for keys, _ in draws])
+            self.authorities.move(MOORE_OFFSETS[np.argsort(keys, axis=1)],
+                                  priority=np.concatenate([priority for _, priority in draws]))
+        else:
+            self.authorities.move(np.concatenate([offsets for _, offsets in draws]),
+                                  rounds=self.authorities.rounds([order for order, _ in draws]))
+
+    def interaction_keys(self):
+        keys = np.empty((len(self.rngs),) + self.in_bounds.shape)
+        citizens = np.arange(self.in_bounds.shape[0] * self.in_bounds.shape[1])
+        for rng, streams, out in zip(self.rngs, self.replica_streams, keys): # drawn straight into each replica's slice
+            if streams is None:
+                rng.random(out=out)
+            else:
+                out[...] = streams.uniform(self.model.steps, citizens, "interact", 8).reshape(out.shape)
+        return keys
+
+    def authority_layer(self):
+        return self.authorities.layer # (K, width, height), global authority indices
+
+    def means(self):
+        # every reporter for every replica, arrays of shape (K,)
+        count = len(self.rngs)
+        values = (self.knowledge, self.behavior, self.net_hb())
+        return {name: v.reshape(count, -1).mean(axis=1) for name, v in zip(REPORTERS, values)}
+
+
+class CommunityEnsemble:
+    def __init__(self, seeds, width=50, height=50,
+                 authority_density=0,
+                 reliability_min=-1,
+                 reliability_max=1,
+                 memory_decay=1.0,
+                 memory_horizon=None,
+                 authority_movement="sequential",
+                 draws="sequential",
+                 reporters=None):
+        seeds = list(seeds)
+        count = len(seeds)
+        if count == 0:
+            raise ValueError("an ensemble needs at least one seed")
+        if authority_movement not in ("sequential", "batched"):
+            raise ValueError(f"unknown authority_movement {authority_movement!r}, expected 'sequential' or 'batched'")
+        if draws not in ("sequential", "keyed"):
+            raise ValueError(f"unknown draws {draws!r}, expected 'sequential' or 'keyed'")
+        self.names = list(REPORTERS) if reporters is None else list(reporters)
+        unknown = set(self.names) - set(REPORTERS)
+        if unknown:
+            raise ValueError(f"unknown reporters {sorted(unknown)}, expected some of {REPORTERS}")
+        self.width = width
+        self.height = height
+        self.authority_movement = authority_movement
+        self.draws = draws
+        self.runs = [{"seed": seed, "authority_density": density, "reliability_min": low, "reliability_max": high}
+                     for seed, density, low, high in zip(
+                         seeds,
+                         per_replica(authority_density, count, "authority_density"),
+                         per_replica(reliability_min, count, "reliability_min"),
+                         per_replica(reliability_max, count, "reliability_max"))]
+        self.steps = 0
+        self.profiler = NULL_PROFILER # VectorizedEngine.step times its phases through this
+        self.familiarity = FamiliarityStore(count * width * height, decay=memory_decay, horizon=memory_horizon)
+        self.engine = EnsembleEngine(self)
+        self.history = [] # (step, {reporter: values for every replica})
+        self.collect()
+
+    def __len__(self):
+        return len(self.runs)
+
+    def collect(self):
+        means = self.engine.means()
+        self.history.append((self.steps, {name: means[name] for name in self.names}))
+
+    def step(self):
+        self.steps += 1
+        self.engine.step()
+        self.familiarity.end_step()
+        self.collect()
+
+    def run(self, steps):
+        for _ in range(steps):
+            self.step()
+        return self
+
+    def reporter(self, name):
+        # (steps + 1, K) array of one reporter for every replica
+        return np.stack([values[name] for _, values in self.history])
+
+    def to_frame(self):
+        # long DataFrame with one row per replica per collected step, like mesa.batch_run output
+        frames = []
+        steps = [step for step, _ in self.history]
+        for k, run in enumerate(self.runs):
+            df = pd.DataFrame({"RunId": k, **run, "Step": steps})
+            for name in self.names:
+                df[name] = self.reporter(name)[:, k]
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,89 @@
+import numpy as np
+
+EVICT_BELOW = 0.05 # decayed familiarity under this is forgotten entirely
+
+def pair_keys(citizens, others):
+    # pack (citizen index, other agent id) into one sortable int64 key
+    return (np.asarray(citizens, dtype=np.int64) << 32) | np.asarray(others, dtype=np.int64)
+
+class FamiliarityStore:
+    # model-level memory of how often each citizen has talked to each other agent
+    # peers never move, so peer familiarity is a fixed-width counter per moore neighbor slot;
+    # authorities wander, so authority familiarity is a sparse sorted COO list of
+    # (citizen, authority) keys with counts
+    def __init__(self, num_citizens, decay=1.0, horizon=None):
+        self.decay = decay # counts are multiplied by this at the end of each step (1 = never forget)
+        self.horizon = horizon # forget authorities not met for this many steps (None = never)
+        self.step = 0
+        self.peer_counts = np.zeros((num_citizens, 8), dtype=np.float32)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.float32)
+        self.last_seen = np.empty(0, dtype=np.int32)
+        self.pending = {} # single increments from the per-agent engine, merged in end_step
+
+    def __len__(self):
+        return len(self.keys) + len(self.pending)
+
+    # peers
+    def bump_peer(self, citizen, slot):
+        # one citizen talked to the peer in the given moore slot, returns the new familiarity
+        self.peer_counts[citizen, slot] += 1
+        return float(self.peer_counts[citizen, slot])
+
+    def bump_peers(self, citizens, slots):
+        # bulk version of bump_peer, each citizen at most once
+        self.peer_counts[citizens, slots] += 1
+        return self.peer_counts[citizens, slots]
+
+    # authorities (or any other agent id)
+    def bump_one(self, citizen, other):
+        # per-agent increment; staged in a dict so the sorted arrays are only rebuilt once a step
+        key = (citizen << 32) | other
+        added = self.pending.get(key, 0) + 1
+        self.pending[key] = added
+        idx = np.searchsorted(self.keys, key)
+        stored = self.counts[idx] if idx < len(self.keys) and self.keys[idx] == key else 0
+        return float(stored) + added
+
+    def bump(self, citizens, others):
+        # bulk increment for a whole step (each pair at most once), returns the new familiarity
+        keys = pair_keys(citizens, others)
+        return self._add(keys, np.ones(len(keys), dtype=np.float32))
+
+    def end_step(self):
+        # merge staged increments, then apply the decay/eviction policy
+        if self.pending:
+            keys = np.fromiter(self.pending.keys(), dtype=np.int64, count=len(self.pending))
+            amounts = np.fromiter(self.pending.values(), dtype=np.float32, count=len(self.pending))
+            self.pending = {}
+            self._add(keys, amounts)
+        self.step += 1
+        keep = None
+        if self.decay != 1:
+            self.peer_counts *= self.decay
+            self.counts *= self.decay
+            keep = self.counts >= EVICT_BELOW
+        if self.horizon is not None:
+            recent = self.last_seen >= self.step - self.horizon
+            keep = recent if keep is None else keep & recent
+        if keep is not None and not keep.all():
+            self.keys, self.counts, self.last_seen = self.keys[keep], self.counts[keep], self.last_seen[keep]
+
+    def _find(self, keys):
+        idx = np.searchsorted(self.keys, keys)
+        found = idx < len(self.keys)
+        found[found] = self.keys[idx[found]] == keys[found]
+        return idx, found
+
+    def _add(self, keys, amounts):
+        idx, found = self._find(keys)
+        self.counts[idx[found]] += amounts[found]
+        self.last_seen[idx[found]] = self.step
+        if not found.all(): # first meetings, insert keeping the arrays sorted
+            new = np.flatnonzero(~found)
+            new = new[np.argsort(keys[new])]
+            self.keys = np.insert(self.keys, idx[new], keys[new])
+            self.counts = np.insert(self.counts, idx[new], amounts[new])
+            self.last_seen = np.insert(self.last_seen, idx[new], self.step)
+            idx, found = self._find(keys)
+        return self.counts[idx]
@@ -1,7 +1,15 @@
 import mesa
 from mesa import Model
 from mesa.space import MultiGrid
-from agents import Citizen, Authority
+from agents import CITIZEN_ATTRIBUTES, Citizen, Authority, CitizenTable
+from vectorized import VectorizedEngine, move_authorities
+from streams import RandomStreams, keyed_authorities, keyed_citizens
+from tiled import TiledEngine
+from memory import FamiliarityStore
+from spatial import AuthorityIndex
+from reporters import CitizenReporters
+from convergence import ConvergenceMonitor
+from profiling import NULL_PROFILER, StepProfiler
 import numpy as np
 
 class CommunityModel(Model):
@@ -9,24 +17,36 @@ class CommunityModel(Model):
     def next_id(self): # used in agent placement
         self._next_id += 1
         return self._next_id
+    # the collected statistics, read from the model's CitizenReporters cache
     def mean_knowledge(self):
-        citizen_knowledge = [c.knowledge for c in self.agents if isinstance(c, Citizen)]
-        return np.mean(citizen_knowledge)
+        return self.reporters.values()["Mean Knowledge"]
     def mean_behavior(self):
-        citizen_behavior = [c.behavior for c in self.agents if isinstance(c, Citizen)]
-        return np.mean(citizen_behavior)
+        return self.reporters.values()["Mean Behavior"]
     def mean_net_hb(self):
-        citizens = [c for c in self.agents if isinstance(c, Citizen)]
-        return np.mean([
-            (c.susceptibility + c.severity) / 2 - (c.benefits + c.barriers) / 2
-            for c in citizens
-            ])
+        return self.reporters.values()["Net Health Belief"]
     
     def __init__(self, width=50, height=50,
                  authority_density=0,
                  reliability_min=-1,
                  reliability_max=1,
-                 seed=0
+                 seed=0,
+                 engine="agents", # "agents" steps Citizen objects, "vectorized" steps numpy arrays,
+                                  # "tiled" steps the arrays strip by strip on several cores
+                 workers=None, # tiled engine: worker processes (None = every core)
+                 tiles=None, # tiled engine: number of strips the grid is cut into (None = one per worker)
+                 memory_decay=1.0, # familiarity is multiplied by this each step (1 = never forget)
+                 memory_horizon=None, # forget authorities not met for this many steps (None = never)
+                 authority_movement="sequential", # "sequential" moves authorities one by one during behave,
+                                                  # "batched" moves them all at once before citizens act
+                 reporters=None, # names of the reporters to collect (None = all of them)
+                 collection_period=1, # collect data every this many steps
+                 convergence_window=None, # stop once the watched reporters stay flat for this many steps (None = never)
+                 convergence_tolerance=1e-3, # how flat: max - min of each watched reporter over the window
+                 convergence_reporters=("Mean Behavior", "Net Health Belief"),
+                 profile=False, # True times every phase of step, "allocations" also traces memory (slow)
+                 draws="sequential" # "sequential" takes random numbers from model.random/model.rng in execution
+                                    # order, "keyed" computes each one from (seed, step, agent, purpose) so
+                                    # vectorized, tiled and ensemble runs agree exactly
                  ):
         super().__init__(seed=seed)
         self._next_id=0 # add underscore to differentiate from mesa method
@@ -34,40 +54,141 @@ class CommunityModel(Model):
         self.height = height
         self.authority_density = authority_density
         self.reliability_range = (reliability_min, reliability_max)
-    
-        #instantiate grid
-        self.grid = MultiGrid(width, height, torus=False) # multigrid so auth and cit can occupy same space
 
-        # citizen placement
-        for x in range(self.grid.width):
-            for y in range(self.grid.height):
-                pos = (x, y)
-                unique_id = self.next_id()
-                citizen = Citizen(model=self, unique_id=unique_id)
-                self.grid.place_agent(citizen, pos)
+        if engine not in ("agents", "vectorized", "tiled"):
+            raise ValueError(f"unknown engine {engine!r}, expected 'agents', 'vectorized' or 'tiled'")
+        if authority_movement not in ("sequential", "batched"):
+            raise ValueError(f"unknown authority_movement {authority_movement!r}, expected 'sequential' or 'batched'")
+        self.authority_movement = authority_movement
+        if profile not in (False, True, "allocations"):
+            raise ValueError(f"unknown profile {profile!r}, expected False, True or 'allocations'")
+        if draws not in ("sequential", "keyed"):
+            raise ValueError(f"unknown draws {draws!r}, expected 'sequential' or 'keyed'")
+        self.streams = None
+        if draws == "keyed": # without a seed, pick one so the streams still have a key
+            self.streams = RandomStreams(self._seed if self._seed is not None else self.rng.integers(2**63))
+        self.engine = None
+        self.citizen_table = None # attribute arrays behind the Citizen objects (agents engine only)
+        # one familiarity store for every citizen instead of a memory dict per citizen
+        self.familiarity = FamiliarityStore(width * height, decay=memory_decay, horizon=memory_horizon)
+        self.authority_index = AuthorityIndex(width, height) # replaced below when authorities are placed
+
+        if engine != "agents":
+            # citizens and authorities are stored as arrays, so no MultiGrid or agent objects
+            self.grid = None
+            self.engine = VectorizedEngine(self) if engine == "vectorized" else TiledEngine(self, workers, tiles)
+        else:
+            #instantiate grid
+            self.grid = MultiGrid(width, height, torus=False) # multigrid so auth and cit can occupy same space
+            self.citizen_table = CitizenTable(width * height) # citizens keep their attributes here
+            if self.streams is not None: # drawn for every citizen at once, same values as the other engines
+                for name, values in zip(CITIZEN_ATTRIBUTES, keyed_citizens(self.streams, (width * height,))):
+                    getattr(self.citizen_table, name)[:] = values
+                self.citizen_table.behavior[:] = self.citizen_table.knowledge > 0
+
+            # citizen placement
+            for x in range(self.grid.width):
+                for y in range(self.grid.height):
+                    pos = (x, y)
+                    unique_id = self.next_id()
+                    citizen = Citizen(model=self, unique_id=unique_id)
+                    self.grid.place_agent(citizen, pos)
 
-        # calculate number of authorities based on density
-        if self.authority_density > 0:
-            num_authorities = int(self.authority_density * self.grid.width * self.grid.height)
-            all_pos = [(x,y) for x in range(self.grid.width) for y in range(self.grid.height)]
-            self.random.shuffle(all_pos)
-            # place authorities randomly
-            for pos in all_pos[:num_authorities]:
-                unique_id = self.next_id() # make sure this isnt overwriting citizen IDs
-                authority = Authority(self, unique_id=unique_id)
-                self.grid.place_agent(authority, pos)
-       
-        # define data collector
-        self.datacollector = mesa.DataCollector(
-            # these will go up/down infinitely if no cap is set
-            model_reporters = {"Mean Knowledge": self.mean_knowledge,
-                               "Mean Behavior": self.mean_behavior,
-                               "Net Health Belief": self.mean_net_hb}
-        )
+            # calculate number of authorities based on density
+            if self.authority_density > 0:
+                num_authorities = int(self.authority_density * self.grid.width * self.grid.height)
+                all_pos = [(x,y) for x in range(self.grid.width) for y in range(self.grid.height)]
+                reliability = [None] * num_authorities # drawn by each Authority
+                if self.streams is None:
+                    self.random.shuffle(all_pos)
+                else:
+                    cells, reliability = keyed_authorities(self.streams, width, height, num_authorities,
+                                                           *self.reliability_range)
+                    all_pos = [all_pos[c] for c in cells.tolist()]
+                    reliability = reliability.tolist()
+                self.authority_index = AuthorityIndex(width, height, all_pos[:num_authorities])
+                # place authorities randomly
+                for i, pos in enumerate(all_pos[:num_authorities]):
+                    unique_id = self.next_id() # make sure this isnt overwriting citizen IDs
+                    authority = Authority(self, unique_id=unique_id, reliability=reliability[i])
+                    authority.index = i
+                    self.authority_index.agents.append(authority)
+                    self.grid.place_agent(authority, pos)
+
+        self.setup_reporting(reporters, collection_period, convergence_window, convergence_tolerance,
+                             convergence_reporters, profile)
+        if self.convergence is not None:
+            self.convergence.update(self.steps, self.reporters.values())
         # initialize data collector
         self.datacollector.collect(self)
 
+    def setup_reporting(self, reporters, collection_period, convergence_window, convergence_tolerance,
+                        convergence_reporters, profile):
+        # reporters, convergence monitor, profiler and data collector; also used by
+        # snapshot.load_snapshot to rebuild a model without running __init__
+        self.profiler = NULL_PROFILER
+        if profile:
+            if self.engine is not None:
+                phases = list(self.engine.PHASES)
+            else:
+                separate = self.authority_movement == "batched" or self.streams is not None
+                phases = (["move authorities"] if separate else []) + ["behave"]
+            phases += ["familiarity"] + (["convergence"] if convergence_window is not None else [])
+            self.profiler = StepProfiler(phases, allocations=profile == "allocations")
+
+        # define data collector; every statistic comes from a single pass over the citizens
+        self.reporters = CitizenReporters(self, reporters)
+        self.collection_period = collection_period
+        model_reporters = self.reporters.model_reporters() # these will go up/down infinitely if no cap is set
+        if collection_period != 1: # rows no longer line up with steps, so record the step too
+            model_reporters = {"Step": lambda model: model.steps, **model_reporters}
+        self.convergence = None
+        if convergence_window is not None:
+            self.convergence = ConvergenceMonitor(convergence_reporters, convergence_tolerance, convergence_window)
+            model_reporters["Convergence Step"] = lambda model: model.convergence.converged_at
+        if self.profiler.enabled:
+            model_reporters.update(self.profiler.model_reporters())
+        self.datacollector = mesa.DataCollector(model_reporters=model_reporters)
+
     # run a step of the model        
     def step(self):
-        self.agents.shuffle_do("behave") # authorities are handled in behave function
-        self.datacollector.collect(self)
\ No newline at end of file
+        profiler = self.profiler # phases are timed only when the model was created with profile=True
+        profiler.start_step()
+        if self.engine is not None:
+            self.engine.step() # the engine times its own phases
+        elif self.streams is not None:
+            # keyed draws: authorities move first, then citizens behave in keyed order, each picking
+            # its authority/peer with this step's interaction keys, as in the vectorized engine
+            with profiler.phase("move authorities", len(self.authority_index)):
+                moved = move_authorities(self.authority_index, None, self.authority_movement, self.streams, self.steps)
+                for i in moved.tolist(): # keep the grid in sync with the index
+                    authority = self.authority_index.agents[i]
+                    self.grid.move_agent(authority, tuple(self.authority_index.pos[i].tolist()))
+            citizens = list(self.agents_by_type[Citizen]) # creation order, so position i is citizen id i
+            with profiler.phase("behave", len(citizens)):
+                ids = np.arange(len(citizens))
+                self.interaction_keys = self.streams.uniform(self.steps, ids, "interact", 8)
+                for i in self.streams.order(self.steps, ids, "order").tolist():
+                    citizens[i].behave()
+        elif self.authority_movement == "batched":
+            with profiler.phase("move authorities", len(self.authority_index)):
+                for i in self.authority_index.move_batched(self.rng): # keep the grid in sync with the index
+                    authority = self.authority_index.agents[i]
+                    self.grid.move_agent(authority, tuple(self.authority_index.pos[i].tolist()))
+            citizens = self.agents_by_type[Citizen]
+            with profiler.phase("behave", len(citizens)):
+                citizens.shuffle_do("behave")
+        else:
+            with profiler.phase("behave", len(self.agents)):
+                self.agents.shuffle_do("behave") # authorities are handled in behave function
+        with profiler.phase("familiarity", len(self.familiarity)):
+            self.familiarity.end_step()
+        if self.convergence is not None:
+            with profiler.phase("convergence"):
+                converged = self.convergence.update(self.steps, self.reporters.values())
+            if converged:
+                self.running = False # reporters have flattened out, no point running further
+        profiler.end_step()
+        if self.steps % self.collection_period == 0 or not self.running: # always keep the final step
+            with profiler.phase("collect"):
+                self.datacollector.collect(self)
\ No newline at end of file
@@ -0,0 +1,50 @@
+import numpy as np
+import solara
+from matplotlib.figure import Figure
+from mesa.visualization.utils import update_counter
+
+# Raster space component for app.py: the whole grid is drawn as one image (imshow) built
+# straight from arrays, instead of one matplotlib marker per agent. Citizens are blue when
+# they behave and red when they don't, authorities are white, same as agent_portrayal.
+# frame_skip redraws only every n-th step so the page keeps up while the model runs at full
+# speed, and grids wider than max_side cells are decimated (every k-th cell) before drawing.
+
+BEHAVED = (0.0, 0.0, 1.0) # blue
+NOT_BEHAVED = (1.0, 0.0, 0.0) # red
+AUTHORITY = (1.0, 1.0, 1.0) # white
+
+def behavior_grid(model):
+    # (width, height) bool array of citizen behavior, from the engine or the citizens
+    if model.engine is not None:
+        return model.engine.behavior
+    return model.citizen_table.grid("behavior", model.width, model.height)
+
+def community_image(model, stride=1):
+    # (height, width, 3) rgb image, rows are y so imshow(origin="lower") matches the grid
+    behavior = behavior_grid(model)[::stride, ::stride]
+    image = np.where(behavior[..., None], BEHAVED, NOT_BEHAVED)
+    authorities = model.authority_index.layer[::stride, ::stride] >= 0
+    image[authorities] = AUTHORITY
+    return image.swapaxes(0, 1)
+
+def make_raster_component(frame_skip=1, max_side=400):
+    def MakeRasterSpace(model):
+        return RasterSpace(model, frame_skip=frame_skip, max_side=max_side)
+    return MakeRasterSpace
+
+@solara.component
+def RasterSpace(model, frame_skip=1, max_side=400):
+    update_counter.get()
+    frame = model.steps // frame_skip # unchanged between redraws, so nothing is re-rendered
+    stride = max(1, -(-max(model.width, model.height) // max_side))
+
+    def draw():
+        fig = Figure()
+        ax = fig.add_subplot()
+        ax.imshow(community_image(model, stride), origin="lower", interpolation="nearest",
+                  extent=(-0.5, model.width - 0.5, -0.5, model.height - 0.5))
+        ax.set_axis_off()
+        return fig
+
+    fig = solara.use_memo(draw, dependencies=[model, frame])
+    solara.FigureMatplotlib(fig, format="png", bbox_inches="tight", dependencies=[model, frame])
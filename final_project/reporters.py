@@ -0,0 +1,34 @@
+import numpy as np
+
+REPORTERS = ["Mean Knowledge", "Mean Behavior", "Net Health Belief"]
+
+def citizen_means(table):
+    # knowledge, behavior and net health belief averaged straight off the citizens' attribute
+    # arrays; rows are in creation order, so the sums match np.mean over a list of the agents
+    net_hb = (table.susceptibility + table.severity) / 2 - (table.benefits + table.barriers) / 2
+    return dict(zip(REPORTERS, (np.mean(table.knowledge), np.mean(table.behavior), np.mean(net_hb))))
+
+class CitizenReporters:
+    # computes every citizen statistic in a single pass the first time one of them is asked for
+    # in a step, then hands the rest out of the cache, so a collect costs one pass instead of three
+    def __init__(self, model, names=None):
+        self.model = model
+        self.names = list(REPORTERS) if names is None else list(names)
+        unknown = set(self.names) - set(REPORTERS)
+        if unknown:
+            raise ValueError(f"unknown reporters {sorted(unknown)}, expected some of {REPORTERS}")
+        self._step = None
+        self._values = {}
+
+    def values(self):
+        if self._step != self.model.steps:
+            if self.model.engine is not None:
+                self._values = self.model.engine.means()
+            else:
+                self._values = citizen_means(self.model.citizen_table)
+            self._step = self.model.steps
+        return self._values
+
+    def model_reporters(self):
+        # DataCollector model_reporters for the chosen statistics
+        return {name: (lambda model, name=name: self.values()[name]) for name in self.names}
@@ -1,3 +1,4 @@
+import sys
 from mesa.batchrunner import batch_run
 from model import CommunityModel
 import pandas as pd
@@ -11,6 +12,8 @@ params = {"width": 50, "height": 50,
 }
 
 if __name__ == '__main__':
+    # output format: csv (default), or parquet/feather for the columnar format in columnar.py
+    output_format = sys.argv[1] if len(sys.argv) > 1 else "csv"
     results = batch_run(
         CommunityModel,
         parameters=params,
@@ -21,4 +24,9 @@ if __name__ == '__main__':
     )
 
     df = pd.DataFrame(results)
-    df.to_csv("batch_results.csv", index=False)
\ No newline at end of file
+    if output_format == "csv":
+        df.to_csv("batch_results.csv", index=False)
+    else:
+        from columnar import write_results
+        from reporters import REPORTERS # the default model collects exactly these
+        write_results(df, f"batch_results.{output_format}", params=list(params), reporters=REPORTERS)
\ No newline at end of file
@@ -0,0 +1,100 @@
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# Columnar storage for batch results, as an alternative to batch_results.csv.
+# Parameter columns are dictionary-encoded (a sweep only has a handful of distinct values
+# per parameter) and reporter columns are stored as float32, which is plenty for means that
+# are plotted, and halves the size; any other column keeps its precision. Rows are sorted by
+# parameter so Parquet row-group statistics can skip whole chunks when filtering.
+# .feather files are written uncompressed so they can be memory-mapped without a copy.
+
+ROW_GROUP_SIZE = 64_000
+ID_COLUMNS = {"RunId": pa.int32(), "iteration": pa.int32(), "Step": pa.int32()}
+
+def to_table(df, params, reporters=None):
+    # arrow table with dictionary-encoded parameters, int32 id columns and float32 reporters;
+    # reporters=None counts every column that is neither a parameter nor an id as a reporter.
+    # Any other column keeps its original precision
+    if reporters is None:
+        reporters = [name for name in df.columns if name not in params and name not in ID_COLUMNS]
+    df = df.sort_values([p for p in params if p in df] + [c for c in ("Step",) if c in df], kind="stable")
+    columns = {}
+    for name in df.columns:
+        values = pa.array(df[name].to_numpy(), from_pandas=True)
+        if name in params:
+            values = values.dictionary_encode()
+        elif name in ID_COLUMNS:
+            values = values.cast(ID_COLUMNS[name])
+        elif name in reporters and pa.types.is_floating(values.type):
+            values = values.cast(pa.float32())
+        columns[name] = values
+    return pa.table(columns)
+
+def write_results(df, path, params, reporters=None):
+    path = Path(path)
+    table = to_table(df, params, reporters)
+    if path.suffix == ".feather":
+        feather.write_feather(table, path, compression="uncompressed")
+    elif path.suffix == ".parquet":
+        pq.write_table(table, path, row_group_size=ROW_GROUP_SIZE)
+    else:
+        raise ValueError(f"unknown columnar format {path.suffix!r}, expected .parquet or .feather")
+    return path
+
+def load_results(path, columns=None, **filters):
+    # load results written by write_results (or a sweep.py output directory), keeping only
+    # rows whose parameters match, e.g. load_results("batch_results.feather",
+    # authority_density=[0.1, 0.2], reliability_min=-1.0)
+    # feather files are memory-mapped, parquet files and directories only read matching row groups
+    path = Path(path)
+    wanted = {name: value if isinstance(value, (list, tuple, set)) else [value]
+              for name, value in filters.items()}
+    if path.suffix == ".feather":
+        # filter columns are read too, then dropped again, like dataset.to_table does below
+        read = None if columns is None else list(columns) + [name for name in wanted if name not in columns]
+        table = feather.read_table(path, columns=read, memory_map=True)
+        mask = None
+        for name, values in wanted.items():
+            column = table[name]
+            if pa.types.is_dictionary(column.type):
+                column = column.cast(column.type.value_type)
+            match = pc.is_in(column, value_set=pa.array(list(values), type=column.type))
+            mask = match if mask is None else pc.and_(mask, match)
+        if mask is not None:
+            table = table.filter(mask)
+        if columns is not None:
+            table = table.select(list(columns))
+    else:
+        fmt = "feather" if _is_feather_dir(path) else "parquet"
+        dataset = ds.dataset(path, format=fmt, partitioning=_hive_partitioning(path))
+        expression = None
+        for name, values in wanted.items():
+            match = ds.field(name).isin(list(values))
+            expression = match if expression is None else expression & match
+        table = dataset.to_table(columns=columns, filter=expression)
+    return table.to_pandas()
+
+def _hive_partitioning(path):
+    # hive partitioning with numeric types for key=value directories (arrow would read 0.1 as a string)
+    values = {}
+    for part in path.rglob("*=*"):
+        if part.is_dir():
+            name, value = part.name.split("=", 1)
+            values.setdefault(name, set()).add(value)
+    fields = []
+    for name, seen in values.items():
+        for arrow_type, cast in ((pa.int64(), int), (pa.float64(), float), (pa.string(), str)):
+            try:
+                [cast(v) for v in seen]
+                break
+            except ValueError:
+                continue
+        fields.append(pa.field(name, arrow_type))
+    return ds.partitioning(pa.schema(fields), flavor="hive")
+
+def _is_feather_dir(path):
+    return path.is_dir() and next(path.rglob("*.feather"), None) is not None
@@ -0,0 +1,78 @@
+import os
+import sys
+import itertools
+from functools import partial
+from multiprocessing import Pool
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent)) # run from anywhere
+from model import CommunityModel
+from batch_runner import params
+from columnar import write_results, load_results
+
+# Resumable parameter sweep. Every finished run is written straight to its own file in a
+# hive-style directory tree keyed by the swept parameters, e.g.
+#     sweep_results/authority_density=0.1/reliability_min=-1.0/reliability_max=0.0/seed=3.parquet
+# Files are written to a temporary name and renamed into place, so a crash never leaves a
+# half-written run behind, and restarting the sweep skips every run that is already on disk.
+# Only one run per worker is ever held in memory, however large the sweep.
+# Runs are stored in the compact columnar format from columnar.py (needs pyarrow), and
+# load_results can filter the whole tree by parameter without reading every file.
+
+FORMATS = {"parquet": ".parquet", "feather": ".feather"}
+
+def expand(parameters):
+    # cartesian product of every list-valued parameter, like mesa.batch_run
+    names = list(parameters)
+    values = [v if isinstance(v, (list, tuple, range)) else [v] for v in parameters.values()]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+def run_path(out_dir, run, swept, fmt):
+    # partition directories for every swept parameter except seed, which names the file
+    parts = [f"{name}={run[name]}" for name in swept if name != "seed"]
+    return Path(out_dir, *parts, f"seed={run.get('seed')}{FORMATS[fmt]}")
+
+def run_one(run, model_cls, out_dir, swept, fmt, max_steps):
+    path = run_path(out_dir, run, swept, fmt)
+    model = model_cls(**run)
+    while model.running and model.steps < max_steps:
+        model.step()
+    df = model.datacollector.get_model_vars_dataframe()
+    if "Step" not in df: # collected every step, so the row number is the step
+        df.insert(0, "Step", range(len(df)))
+    # partition keys live in the path, everything else is stored as a column
+    for name, value in run.items():
+        if name in swept and name != "seed":
+            continue
+        df[name] = value
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.stem}.{os.getpid()}{path.suffix}") # dotfiles are skipped when loading
+    write_results(df.reset_index(drop=True), tmp, params=[name for name in run if name in df],
+                  reporters=[name for name in model.datacollector.model_vars if name != "Step"])
+    os.replace(tmp, path) # atomic, so a run is either fully on disk or not at all
+    return path
+
+def run_sweep(model_cls, parameters, out_dir, max_steps=300, processes=None, fmt="parquet",
+              display_progress=True):
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}, expected one of {list(FORMATS)}")
+    swept = [name for name, v in parameters.items() if isinstance(v, (list, tuple, range))]
+    runs = expand(parameters)
+    todo = [run for run in runs if not run_path(out_dir, run, swept, fmt).exists()]
+    if display_progress:
+        print(f"{len(runs) - len(todo)} of {len(runs)} runs already on disk, {len(todo)} to go")
+    job = partial(run_one, model_cls=model_cls, out_dir=out_dir, swept=swept, fmt=fmt, max_steps=max_steps)
+    with Pool(processes) as pool:
+        for done, path in enumerate(pool.imap_unordered(job, todo), start=1):
+            if display_progress:
+                print(f"[{done}/{len(todo)}] {path}")
+    return out_dir
+
+def load_sweep(out_dir, columns=None, **filters):
+    # read runs back into one DataFrame (partition keys become columns again), optionally
+    # only those matching the given parameter values
+    return load_results(out_dir, columns=columns, **filters)
+
+if __name__ == '__main__':
+    out_dir = sys.argv[1] if len(sys.argv) > 1 else "sweep_results"
+    run_sweep(CommunityModel, params, out_dir, max_steps=300)
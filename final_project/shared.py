@@ -0,0 +1,17 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+# Modules shared with A1 live in tools/ at the repository root. load("step_profiler") loads
+# tools/step_profiler.py as tools.step_profiler (the name it has when the repository root is
+# importable) instead of putting tools/ on sys.path, so nothing in tools/ can shadow other imports
+
+def load(name):
+    module = sys.modules.get(f"tools.{name}")
+    if module is None:
+        path = Path(__file__).resolve().parent.parent / "tools" / f"{name}.py"
+        spec = importlib.util.spec_from_file_location(f"tools.{name}", path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)
+    return module
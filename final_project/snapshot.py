@@ -0,0 +1,186 @@
+import io
+import json
+import numpy as np
+from mesa import Agent, Model
+from mesa.space import MultiGrid
+from agents import CITIZEN_ATTRIBUTES, Citizen, Authority, CitizenTable
+from model import CommunityModel
+from memory import FamiliarityStore
+from spatial import AuthorityIndex
+from streams import RandomStreams
+from tiled import TiledEngine
+from vectorized import VectorizedEngine, neighbor_views
+
+# Snapshots of a CommunityModel between steps, so a warmed-up run can be paused, resumed or
+# branched into many scenarios without re-simulating from step 0.
+# A snapshot is one .npz file: citizen attributes as (width, height) arrays (from the agents or
+# the vectorized engine), authority positions/reliabilities, the familiarity store, the random
+# generators' states (and the keyed streams' seed), and a JSON header with the model settings and
+# the DataCollector rows.
+# load_snapshot rebuilds the model without running CommunityModel.__init__ (no placement, no
+# random draws), so a restored model continues exactly like the original would have:
+#     save_snapshot(model, "warm.npz")
+#     branch = load_snapshot("warm.npz"); branch.authority_index ... ; branch.step()
+#     copy = fork(model) # same thing in memory
+
+VERSION = 1
+
+def _plain(value):
+    # numpy scalars -> python values json can store
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    return value
+
+def save_snapshot(model, path, tail=None, compress=False):
+    # write model's state to path (a filename or a binary file object); tail keeps only the last
+    # `tail` DataCollector rows instead of the whole history
+    if model.familiarity.pending:
+        raise ValueError("snapshots can only be taken between steps")
+    width, height = model.width, model.height
+    arrays = {}
+    if model.engine is not None:
+        for name in CITIZEN_ATTRIBUTES:
+            arrays[f"citizen_{name}"] = getattr(model.engine, name)
+        arrays["authority_reliability"] = model.engine.authority_reliability
+        arrays["authority_id"] = np.arange(len(model.authority_index))
+    else:
+        citizens = list(model.agents_by_type[Citizen])
+        # citizens are created x-major, one per cell, and never move
+        for name in CITIZEN_ATTRIBUTES:
+            arrays[f"citizen_{name}"] = model.citizen_table.grid(name, width, height)
+        arrays["citizen_id"] = np.array([c.unique_id for c in citizens]).reshape(width, height)
+        authorities = model.authority_index.agents
+        arrays["authority_reliability"] = np.array([a.reliability for a in authorities], dtype=float)
+        arrays["authority_id"] = np.array([a.unique_id for a in authorities], dtype=np.int64)
+    arrays["authority_pos"] = model.authority_index.pos
+    memory = model.familiarity
+    for name in ("peer_counts", "keys", "counts", "last_seen"):
+        arrays[f"familiarity_{name}"] = getattr(memory, name)
+
+    convergence = None
+    if model.convergence is not None:
+        monitor = model.convergence
+        convergence = {"reporters": monitor.reporters, "tolerance": monitor.tolerance, "window": monitor.window,
+                       "history": [[_plain(v) for v in row] for row in monitor.history],
+                       "converged_at": monitor.converged_at}
+    rows = slice(-tail, None) if tail else slice(None)
+    header = {
+        "version": VERSION,
+        "width": width, "height": height,
+        "authority_density": model.authority_density,
+        "reliability_range": list(model.reliability_range),
+        "engine": "agents" if model.engine is None else "tiled" if isinstance(model.engine, TiledEngine) else "vectorized",
+        "workers": getattr(model.engine, "workers", None), "tiles": len(getattr(model.engine, "bounds", ())) or None,
+        "authority_movement": model.authority_movement,
+        "memory_decay": memory.decay, "memory_horizon": memory.horizon, "memory_step": memory.step,
+        "reporters": model.reporters.names,
+        "collection_period": model.collection_period,
+        "convergence": convergence,
+        "profile": ("allocations" if model.profiler.allocations else True) if model.profiler.enabled else False,
+        "steps": model.steps, "running": model.running, "next_id": model._next_id, "seed": _plain(model._seed),
+        "random_state": model.random.getstate(),
+        "rng_state": model.rng.bit_generator.state,
+        "streams_seed": None if model.streams is None else model.streams.seed, # draws="keyed"
+        "model_vars": {name: [_plain(v) for v in values[rows]]
+                       for name, values in model.datacollector.model_vars.items()},
+    }
+    arrays["header"] = np.array(json.dumps(header))
+    (np.savez_compressed if compress else np.savez)(path, **arrays)
+
+def load_snapshot(path):
+    # rebuild a CommunityModel from a snapshot written by save_snapshot
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    header = json.loads(str(arrays.pop("header")))
+    if header["version"] != VERSION:
+        raise ValueError(f"unsupported snapshot version {header['version']}, expected {VERSION}")
+    width, height = header["width"], header["height"]
+
+    model = CommunityModel.__new__(CommunityModel)
+    Model.__init__(model, seed=header["seed"]) # only mesa's bookkeeping, generators are restored below
+    model._next_id = header["next_id"]
+    model.width, model.height = width, height
+    model.authority_density = header["authority_density"]
+    model.reliability_range = tuple(header["reliability_range"])
+    model.authority_movement = header["authority_movement"]
+    model.familiarity = FamiliarityStore(width * height, decay=header["memory_decay"], horizon=header["memory_horizon"])
+    model.familiarity.step = header["memory_step"]
+    for name in ("peer_counts", "keys", "counts", "last_seen"):
+        setattr(model.familiarity, name, arrays[f"familiarity_{name}"].copy())
+    model.authority_index = AuthorityIndex(width, height, arrays["authority_pos"])
+    model.engine = None
+    model.citizen_table = None
+    model.streams = None if header["streams_seed"] is None else RandomStreams(header["streams_seed"])
+
+    if header["engine"] != "agents":
+        model.grid = None
+        engine_class = TiledEngine if header["engine"] == "tiled" else VectorizedEngine
+        engine = engine_class.__new__(engine_class) # __init__ would draw fresh citizens
+        engine.model = model
+        engine.rng = model.rng
+        engine.streams = model.streams
+        for name in CITIZEN_ATTRIBUTES:
+            setattr(engine, name, arrays[f"citizen_{name}"].copy())
+        engine.memory = model.familiarity
+        engine.in_bounds = neighbor_views(np.ones((width, height), dtype=bool), False)
+        engine.authorities = model.authority_index
+        engine.authority_reliability = arrays["authority_reliability"].copy()
+        if header["engine"] == "tiled":
+            engine.start(header["workers"], header["tiles"]) # state moves into shared memory
+        model.engine = engine
+    else:
+        model.grid = MultiGrid(width, height, torus=False)
+        model.citizen_table = CitizenTable(width * height)
+        for name in CITIZEN_ATTRIBUTES:
+            getattr(model.citizen_table, name)[:] = arrays[f"citizen_{name}"].ravel()
+        # same creation order as __init__, so agent sets shuffle the same way
+        ids = arrays["citizen_id"].tolist()
+        for x in range(width):
+            for y in range(height):
+                citizen = Citizen.__new__(Citizen) # Citizen.__init__ would draw fresh attributes
+                Agent.__init__(citizen, model)
+                citizen.unique_id = ids[x][y]
+                citizen.table = model.citizen_table
+                citizen.index = model.citizen_table.add() # x * height + y
+                citizen.cached_neighbors = None
+                citizen.cached_cells = None
+                model.grid.place_agent(citizen, (x, y))
+        for i, (pos, reliability, unique_id) in enumerate(zip(arrays["authority_pos"].tolist(),
+                                                              arrays["authority_reliability"].tolist(),
+                                                              arrays["authority_id"].tolist())):
+            authority = Authority.__new__(Authority)
+            Agent.__init__(authority, model)
+            authority.unique_id = unique_id
+            authority.reliability = reliability
+            authority.index = i
+            model.authority_index.agents.append(authority)
+            model.grid.place_agent(authority, tuple(pos))
+
+    convergence = header["convergence"]
+    model.setup_reporting(header["reporters"], header["collection_period"],
+                          convergence["window"] if convergence else None,
+                          convergence["tolerance"] if convergence else 1e-3,
+                          convergence["reporters"] if convergence else (), header["profile"])
+    if convergence:
+        model.convergence.history.extend(convergence["history"])
+        model.convergence.converged_at = convergence["converged_at"]
+    for name, values in header["model_vars"].items():
+        model.datacollector.model_vars[name] = values
+
+    model.steps = header["steps"]
+    model.running = header["running"]
+    version, state, gauss = header["random_state"]
+    model.random.setstate((version, tuple(state), gauss))
+    model.rng.bit_generator.state = header["rng_state"]
+    return model
+
+def fork(model):
+    # independent copy of model, through an in-memory snapshot
+    buffer = io.BytesIO()
+    save_snapshot(model, buffer)
+    buffer.seek(0)
+    return load_snapshot(buffer)
@@ -0,0 +1,192 @@
+import numpy as np
+
+# moore neighborhood offsets (dx, dy); slot k and slot 7 - k point in opposite directions
+MOORE_OFFSETS = np.array([(-1, -1), (-1, 0), (-1, 1),
+                          (0, -1),           (0, 1),
+                          (1, -1),  (1, 0),  (1, 1)])
+
+class AuthorityIndex:
+    # occupancy layer for authorities: layer[x, y] is the index of the authority in that cell
+    # (-1 if none), kept up to date as authorities move so citizens never have to query the grid
+    # at most one authority per cell, so one int per cell is enough
+    def __init__(self, width, height, positions=()):
+        self.layer = np.full((width, height), -1, dtype=np.int64)
+        self.pos = np.array(positions, dtype=np.int64).reshape(-1, 2)
+        self.layer[tuple(self.pos.T)] = np.arange(len(self.pos))
+        # flat python mirror of the layer, much cheaper than numpy for one-cell lookups
+        self.occupant = self.layer.ravel().tolist()
+        self.agents = [] # Authority objects by index (per-agent engine only)
+
+    def __len__(self):
+        return len(self.pos)
+
+    def flat(self, pos):
+        return pos[0] * self.layer.shape[1] + pos[1]
+
+    def is_free(self, pos):
+        return self.occupant[self.flat(pos)] < 0
+
+    def move(self, i, new_pos):
+        # relocate authority i, keeping the layer, its mirror and the position array in sync
+        old_pos = tuple(self.pos[i])
+        self.layer[old_pos] = -1
+        self.layer[new_pos] = i
+        self.occupant[self.flat(old_pos)] = -1
+        self.occupant[self.flat(new_pos)] = i
+        self.pos[i] = new_pos
+
+    def neighbor_cells(self, pos):
+        # flat ids of the moore neighborhood of pos (excluding pos itself), in the same
+        # x-major order the grid returns neighbors in; static, so callers can cache it
+        width, height = self.layer.shape
+        x, y = pos
+        return [nx * height + ny
+                for nx in range(x - 1, x + 2) for ny in range(y - 1, y + 2)
+                if (nx, ny) != (x, y) and 0 <= nx < width and 0 <= ny < height]
+
+    def around(self, cells):
+        # indices of the authorities currently in the given cells
+        occupant = self.occupant
+        return [i for i in [occupant[c] for c in cells] if i >= 0]
+
+    def agents_around(self, cells):
+        return [self.agents[i] for i in self.around(cells)]
+
+    def move_batched(self, rng, keys=None, priority=None):
+        # move every authority at once: each one walks its own shuffled moore neighborhood and
+        # proposes the first free cell; when several propose the same cell a random one wins and
+        # the rest retry against the updated layer. returns the indices of the authorities that moved
+        # keys (n, 8) and priority (n,) replace the draws from rng (draws="keyed")
+        n = len(self.pos)
+        width, height = self.layer.shape
+        if keys is None:
+            keys = rng.random((n, 8))
+        order = np.argsort(keys, axis=1)
+        targets = self.pos[:, None, :] + MOORE_OFFSETS[order]
+        in_bounds = ((targets >= 0) & (targets < (width, height))).all(axis=-1)
+        targets = np.where(in_bounds, targets[..., 0] * height + targets[..., 1], -1)
+        if priority is None:
+            priority = rng.random(n)
+        layer = self.layer.reshape(-1) # view, so writes land in self.layer
+        cells = self.pos[:, 0] * height + self.pos[:, 1]
+        moved = claim_cells(layer, cells, targets, priority)
+        self.pos[moved] = np.stack(np.divmod(cells[moved], height), axis=-1)
+        self.occupant = layer.tolist()
+        return moved
+
+
+def claim_cells(layer, cells, targets, priority):
+    # batched moves on a flat occupancy layer (authority index per cell, -1 if empty): every
+    # authority proposes the first free cell of its targets (n, 8) row (-1 = off the grid), one
+    # winner per proposed cell (lowest priority), the rest retry against the updated layer.
+    # cells (each authority's flat cell) is updated in place; returns the indices that moved
+    moved = np.zeros(len(cells), dtype=bool)
+    pending = np.arange(len(cells))
+    while len(pending):
+        candidates = targets[pending]
+        free = (candidates >= 0) & (layer[np.maximum(candidates, 0)] < 0)
+        can_move = free.any(axis=1)
+        pending, candidates, free = pending[can_move], candidates[can_move], free[can_move]
+        if not len(pending): # everyone left is boxed in and stays put
+            break
+        wanted = candidates[np.arange(len(pending)), np.argmax(free, axis=1)]
+        # one winner per wanted cell: sort by cell, then by priority, keep the first of each run
+        by_cell = np.lexsort((priority[pending], wanted))
+        first = np.ones(len(by_cell), dtype=bool)
+        first[1:] = wanted[by_cell][1:] != wanted[by_cell][:-1]
+        winners, won = pending[by_cell[first]], wanted[by_cell[first]]
+        layer[cells[winners]] = -1
+        layer[won] = winners
+        cells[winners] = won
+        moved[winners] = True
+        pending = pending[by_cell[~first]] # losers try their next free cell
+    return np.flatnonzero(moved)
+
+def claim_in_turn(layer, cells, targets, rounds):
+    # sequential moves on a flat occupancy layer: the authorities of each round take the first
+    # free cell of their targets row, round after round. Authorities sharing a round must not be
+    # able to interfere (e.g. they live in different replicas of a stacked layer).
+    # cells is updated in place; returns the indices that moved
+    moved = []
+    for group in rounds:
+        candidates = targets[group]
+        free = (candidates >= 0) & (layer[np.maximum(candidates, 0)] < 0)
+        can_move = free.any(axis=1)
+        group, candidates, free = group[can_move], candidates[can_move], free[can_move]
+        wanted = candidates[np.arange(len(group)), np.argmax(free, axis=1)]
+        layer[cells[group]] = -1
+        layer[wanted] = group
+        cells[group] = wanted
+        moved.append(group)
+    return np.sort(np.concatenate(moved)) if moved else np.zeros(0, dtype=np.int64)
+
+
+class StackedAuthorityIndex:
+    # occupancy layers of K independent replicas stacked as layer[k, x, y] (used by
+    # CommunityEnsemble). Authorities are numbered across the stack, replica k's starting at
+    # offsets[k], and the layer holds these global indices, so one pass over the stack moves
+    # the authorities of every replica at once; replicas never share cells, so their moves
+    # can't interfere and each replica moves exactly like its own AuthorityIndex would
+    def __init__(self, width, height, positions):
+        # positions: one (n_k, 2) array of authority positions per replica
+        positions = [np.array(p, dtype=np.int64).reshape(-1, 2) for p in positions]
+        self.counts = np.array([len(p) for p in positions], dtype=np.int64)
+        self.offsets = np.cumsum(self.counts) - self.counts
+        self.replica = np.repeat(np.arange(len(positions)), self.counts)
+        self.pos = np.concatenate(positions)
+        self.layer = np.full((len(positions), width, height), -1, dtype=np.int64)
+        self.layer[self.replica, self.pos[:, 0], self.pos[:, 1]] = np.arange(len(self.pos))
+
+    def __len__(self):
+        return len(self.pos)
+
+    def flat_cells(self, pos):
+        # flat ids into the whole stack of (..., 2) positions, -1 off the grid
+        _, width, height = self.layer.shape
+        in_bounds = ((pos >= 0) & (pos < (width, height))).all(axis=-1)
+        replica = self.replica.reshape((-1,) + (1,) * (pos.ndim - 2))
+        return np.where(in_bounds, (replica * width + pos[..., 0]) * height + pos[..., 1], -1)
+
+    def move(self, offsets, rounds=None, priority=None):
+        # offsets (n, 8, 2): the moore offsets in the order each authority tries them.
+        # rounds (visiting order, sequential movement) or priority (batched movement)
+        height = self.layer.shape[2]
+        targets = self.flat_cells(self.pos[:, None, :] + offsets)
+        cells = self.flat_cells(self.pos[:, None, :])[:, 0]
+        layer = self.layer.reshape(-1) # view, so writes land in self.layer
+        if rounds is None:
+            moved = claim_cells(layer, cells, targets, priority)
+        else:
+            moved = claim_in_turn(layer, cells, targets, rounds)
+        self.pos[moved] = np.stack(np.divmod(cells[moved] % (self.layer.shape[1] * height), height), axis=-1)
+        return moved
+
+    def rounds(self, orders):
+        # group the authorities into rounds that claim_in_turn can move exactly like visiting each
+        # replica's authorities one by one in its visiting order (local indices). An authority only
+        # reads and writes cells within distance 1 of where it starts, so two authorities can only
+        # affect each other if they start within distance 2; each authority goes one round after
+        # the latest of those visited before it, and authorities sharing a round never interfere
+        _, width, height = self.layer.shape
+        rank = np.empty(len(self.pos), dtype=np.int64)
+        for k, order in enumerate(orders):
+            rank[np.asarray(order, dtype=np.int64) + self.offsets[k]] = np.arange(len(order))
+        # every authority's neighbors within distance 2, read off a padded layer of global indices
+        padded = np.full((len(self.counts), width + 4, height + 4), -1, dtype=np.int64)
+        padded[:, 2:-2, 2:-2] = self.layer
+        window = np.array([dx * (height + 4) + dy for dx in range(-2, 3) for dy in range(-2, 3) if (dx, dy) != (0, 0)])
+        centers = (self.replica * (width + 4) + self.pos[:, 0] + 2) * (height + 4) + self.pos[:, 1] + 2
+        near = padded.reshape(-1)[centers[:, None] + window]
+        later, slot = np.nonzero((near >= 0) & (rank[np.maximum(near, 0)] < rank[:, None]))
+        earlier = near[later, slot] # edges later -> earlier-visited neighbor, grouped by later
+        heads = np.flatnonzero(np.diff(later, prepend=-1))
+        # round = longest chain of earlier-visited neighbors, found by relaxing until it settles
+        level = np.zeros(len(self.pos), dtype=np.int64)
+        while len(heads):
+            updated = np.zeros_like(level)
+            updated[later[heads]] = np.maximum.reduceat(level[earlier] + 1, heads)
+            if np.array_equal(updated, level):
+                break
+            level = updated
+        by_level = np.argsort(level, kind="stable")
+        return np.split(by_level, np.flatnonzero(np.diff(level[by_level])) + 1) if len(by_level) else []
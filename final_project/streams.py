@@ -0,0 +1,36 @@
+import numpy as np
+
+from shared import load
+
+# Counter-based random numbers for draws="keyed". Every number is a pure function of
+# (seed, step, agent id, purpose, k) instead of the next value of one sequential generator, so
+# a draw doesn't depend on which agents drew before it, what order they ran in or which process
+# computed it. The streams themselves are shared with A1 (tools/counter_streams.py); only the
+# purposes below are this model's. Agent id i owns positions i * size ... (i + 1) * size of each
+# (seed, purpose, step) stream, so a whole population's draws come out of one vectorized call
+# and a worker can jump straight to its own agents:
+#     streams = RandomStreams(seed)
+#     keys = streams.uniform(step, np.arange(n), "interact", 8) # (n, 8) in [0, 1)
+#     order = streams.order(step, ids, "order") # activation order of the agents in ids
+
+PURPOSES = {name: i for i, name in enumerate([
+    "init", "place", "reliability", # set-up draws (step 0)
+    "order", "interact", "move", "priority", # per-step draws
+])}
+
+class RandomStreams(load("counter_streams").RandomStreams):
+    purposes = PURPOSES
+
+# CommunityModel set-up, shared by every engine so keyed runs start from the same state;
+# a citizen's id is its flat cell x * height + y, an authority's id its index
+
+def keyed_citizens(streams, shape):
+    # (5, *shape) susceptibility, severity, benefits, barriers, knowledge, uniform in [-1, 1)
+    count = int(np.prod(shape))
+    return (-1 + 2 * streams.uniform(0, np.arange(count), "init", 5)).T.reshape((5,) + tuple(shape))
+
+def keyed_authorities(streams, width, height, count, low, high):
+    # flat cells of count authorities on distinct random cells, and their reliabilities
+    cells = streams.order(0, np.arange(width * height), "place")[:count]
+    reliability = low + (high - low) * streams.uniform(0, np.arange(count), "reliability")
+    return cells, reliability
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ensemble import CommunityEnsemble
+from model import CommunityModel
+from results.engine_check import POINTS, THRESHOLD, final_reporters, welch_t
+from snapshot import fork, load_snapshot, save_snapshot
+
+# Exactness checks between the engines. The per-agent engine only matches the vectorized one
+# statistically; the last test runs a smaller version of results/engine_check.py for that
+
+STATE = ("knowledge", "behavior", "benefits", "severity")
+REPORTERS = ["Mean Knowledge", "Mean Behavior", "Net Health Belief"]
+
+def run(model, steps):
+    for _ in range(steps):
+        model.step()
+    return model
+
+def reporters(model):
+    # every reporter except the timings, which never match
+    return pd.DataFrame({name: values for name, values in model.datacollector.model_vars.items() if "Time" not in name})
+
+@pytest.mark.parametrize("params", [
+    dict(authority_density=0.1),
+    dict(authority_density=0.3, authority_movement="batched", memory_decay=0.9, memory_horizon=3),
+    dict(authority_density=0.0),
+])
+@pytest.mark.parametrize("workers, tiles", [(1, None), (2, 5)])
+def test_tiled_matches_vectorized(params, workers, tiles):
+    vectorized = run(CommunityModel(37, 23, seed=5, engine="vectorized", **params), 10)
+    tiled = CommunityModel(37, 23, seed=5, engine="tiled", workers=workers, tiles=tiles, **params)
+    try:
+        run(tiled, 10)
+        assert reporters(tiled).equals(reporters(vectorized))
+        for name in STATE:
+            assert np.array_equal(getattr(tiled.engine, name), getattr(vectorized.engine, name))
+        for name in ("peer_counts", "keys", "counts"):
+            assert np.array_equal(getattr(tiled.familiarity, name), getattr(vectorized.familiarity, name))
+    finally:
+        tiled.engine.close()
+
+@pytest.mark.parametrize("params", [
+    dict(authority_density=0.1),
+    dict(authority_density=0.2, authority_movement="batched", memory_decay=0.9, memory_horizon=5),
+])
+def test_ensemble_matches_vectorized(params):
+    seeds = [3, 4, 5]
+    frame = CommunityEnsemble(seeds, 30, 30, **params).run(15).to_frame()
+    for k, seed in enumerate(seeds):
+        model = run(CommunityModel(30, 30, seed=seed, engine="vectorized", **params), 15)
+        replica = frame[frame.RunId == k][REPORTERS].to_numpy()
+        assert np.array_equal(model.datacollector.get_model_vars_dataframe()[REPORTERS].to_numpy(), replica)
+
+@pytest.mark.parametrize("params", [
+    dict(authority_density=0.1),
+    dict(authority_density=0.1, engine="vectorized"),
+    dict(authority_density=0.2, engine="vectorized", authority_movement="batched", draws="keyed"),
+    dict(authority_density=0.2, authority_movement="batched", convergence_window=5, memory_decay=0.9, memory_horizon=4),
+    dict(authority_density=0.0, collection_period=3, profile=True),
+])
+def test_snapshot_and_fork_continue_exactly(params, tmp_path):
+    model = run(CommunityModel(20, 20, seed=4, **params), 8)
+    save_snapshot(model, tmp_path / "model.npz")
+    copies = [load_snapshot(tmp_path / "model.npz"), fork(model)]
+    for copy in [model, *copies]:
+        run(copy, 10)
+    for copy in copies:
+        assert copy.steps == model.steps
+        assert reporters(copy).equals(reporters(model))
+
+@pytest.mark.parametrize("params", [dict(authority_density=0.1), dict(authority_density=0.3, authority_movement="batched")])
+def test_keyed_draws_match_across_engines(params):
+    vectorized = CommunityModel(37, 23, seed=5, engine="vectorized", draws="keyed", **params)
+    agents = CommunityModel(37, 23, seed=5, engine="agents", draws="keyed", **params)
+    assert np.array_equal(agents.citizen_table.grid("knowledge", 37, 23), vectorized.engine.knowledge)
+    tiled = CommunityModel(37, 23, seed=5, engine="tiled", workers=2, tiles=5, draws="keyed", **params)
+    try:
+        run(vectorized, 8)
+        run(tiled, 8)
+        for name in STATE:
+            assert np.array_equal(getattr(tiled.engine, name), getattr(vectorized.engine, name))
+    finally:
+        tiled.engine.close()
+    ensemble = CommunityEnsemble([5, 9], 37, 23, draws="keyed", **params).run(8)
+    for k, seed in enumerate([5, 9]):
+        model = vectorized if seed == 5 else run(CommunityModel(37, 23, seed=seed, engine="vectorized", draws="keyed", **params), 8)
+        for name in ("knowledge", "behavior"):
+            assert np.array_equal(getattr(ensemble.engine, name)[k], getattr(model.engine, name))
+
+@pytest.mark.parametrize("point", POINTS)
+def test_agents_engine_matches_vectorized_statistically(point):
+    # 12 seeds and 25 steps instead of engine_check.py's defaults of 20 and 40, to keep it quick
+    t = welch_t(final_reporters("agents", 12, 25, *point), final_reporters("vectorized", 12, 25, *point))
+    assert np.all(np.abs(t) < THRESHOLD)
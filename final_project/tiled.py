@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import weakref
+import numpy as np
+from spatial import MOORE_OFFSETS
+from vectorized import VectorizedEngine, pick_slot, take_slot
+
+# Multi-core version of the vectorized engine for single huge runs. Citizens only ever look at
+# their moore neighborhood on a non-toroidal grid, so the grid is cut into strips of whole
+# x-rows (tiles) and a process pool steps the strips in parallel. All state lives in shared
+# memory: each worker reads its strip plus a one-row halo on either side straight from the
+# previous step's arrays and writes only its own rows, and the halo exchange is simply the
+# barrier between phases (every worker sees the other strips' new rows once the phase is done).
+# The parent keeps the parts that are global by nature:
+#   - authority movement, on the shared occupancy layer, so an authority crossing a strip edge is
+#     picked up by the next strip without any migration step
+#   - the random keys, drawn into shared memory from the model's generator (with draws="keyed"
+#     each worker computes its own strip's keys instead, see streams.py)
+#   - authority familiarity, whose sorted store can't be split by strip; workers hand back the
+#     (citizen, authority) pairs they heard from and the parent applies them between the phases
+# The draws and arithmetic are the same as VectorizedEngine, so a tiled run matches
+# CommunityModel(engine="vectorized") with the same seed exactly, just on more cores:
+#     model = CommunityModel(width=2000, height=2000, engine="tiled", workers=8)
+#     model.step() ...
+#     model.engine.close() # stops the workers (also done when the model is garbage collected)
+
+STATE = ("susceptibility", "severity", "benefits", "barriers", "knowledge", "behavior")
+
+def strips(width, count):
+    # split range(width) into count contiguous (x0, x1) strips of near-equal size
+    edges = np.linspace(0, width, min(count, width) + 1).round().astype(int)
+    return [(int(x0), int(x1)) for x0, x1 in zip(edges[:-1], edges[1:])]
+
+def strip_views(arr, x0, x1, fill):
+    # neighbor_views(arr, fill)[x0:x1], built from rows x0 - 1 ... x1 only (the strip and its halo)
+    width, height = arr.shape[:2]
+    lo, hi = max(x0 - 1, 0), min(x1 + 1, width)
+    pad = [(1 - (x0 - lo), 1 - (hi - x1)), (1, 1)] + [(0, 0)] * (arr.ndim - 2)
+    padded = np.pad(arr[lo:hi], pad, constant_values=fill)
+    return np.stack([
+        padded[1 + dx:1 + dx + x1 - x0, 1 + dy:1 + dy + height]
+        for dx, dy in MOORE_OFFSETS
+    ], axis=-1)
+
+def shared_array(ctx, shape, dtype, data=None):
+    # numpy view of a fresh block of shared memory; returns (block, view) so the block can be
+    # handed to the workers when the pool starts
+    dtype = np.dtype(dtype)
+    block = ctx.RawArray("b", max(int(np.prod(shape)) * dtype.itemsize, 1))
+    view = np.frombuffer(block, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+    if data is not None:
+        view[...] = data
+    return block, view
+
+
+# worker side: every worker attaches to the shared arrays once, when the pool starts
+_shared = {}
+_in_bounds = {} # in_bounds for each strip, computed the first time a worker steps it
+_streams = [None] # the model's RandomStreams with draws="keyed"
+
+def _attach(blocks, streams):
+    _streams[0] = streams
+    for name, (block, shape, dtype) in blocks.items():
+        _shared[name] = np.frombuffer(block, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+def _interact(task):
+    # phase 1 for one strip: peer pressure from the start-of-step behavior, then each citizen
+    # talks to one random neighboring authority or else one random peer (VectorizedEngine
+    # .peer_pressure/.adjust_knowledge). New knowledge goes to knowledge_next so neighbors keep
+    # reading the old values; authority talks are returned for the parent to apply
+    bounds, step = task
+    x0, x1 = bounds
+    s = _shared
+    height = s["knowledge"].shape[1]
+    in_bounds = _in_bounds.get(bounds)
+    if in_bounds is None:
+        in_bounds = _in_bounds[bounds] = strip_views(np.ones(s["knowledge"].shape, dtype=bool), x0, x1, False)
+
+    behaved = (strip_views(s["behavior"], x0, x1, False) & in_bounds).sum(axis=-1)
+    not_behaved = in_bounds.sum(axis=-1) - behaved
+    s["peer_pressure"][x0:x1] = np.where(not_behaved > 0, behaved / np.maximum(not_behaved, 1), behaved)
+
+    streams = _streams[0]
+    if streams is None:
+        keys = s["keys"][x0:x1]
+    else: # the strip's own rows of VectorizedEngine.interaction_keys()
+        citizens = np.arange(x0 * height, x1 * height)
+        keys = streams.uniform(step, citizens, "interact", 8).reshape(x1 - x0, height, 8)
+    authority_views = strip_views(s["authority_layer"], x0, x1, -1)
+    authority_slot = pick_slot(authority_views >= 0, keys)
+    peer_slot = pick_slot(in_bounds, keys)
+    knowledge = s["knowledge"][x0:x1].copy()
+
+    heard = authority_slot >= 0
+    authorities = take_slot(authority_views, authority_slot)[heard]
+
+    # peer familiarity rows belong to the strip's own citizens, so workers bump them in place
+    talked = ~heard & (peer_slot >= 0)
+    citizens, slots = x0 * height + np.flatnonzero(talked), peer_slot[talked]
+    peer_counts = s["peer_counts"]
+    peer_counts[citizens, slots] += 1
+    familiarity = peer_counts[citizens, slots]
+    interlocutor = take_slot(strip_views(s["knowledge"], x0, x1, 0.0), peer_slot)[talked]
+    own = knowledge[talked]
+    sign = np.where((interlocutor > 0) & (own != 0), 1, -1)
+    knowledge[talked] += sign * 0.1 * familiarity
+
+    s["knowledge_next"][x0:x1] = knowledge
+    return x0 * height + np.flatnonzero(heard), authorities
+
+def _health_belief(bounds):
+    # phase 2 for one strip: adopt the new knowledge and update the health beliefs and behavior
+    # (VectorizedEngine.adjust_health_belief); every input is the strip's own rows, so no halo
+    x0, x1 = bounds
+    s = _shared
+    knowledge = s["knowledge"][x0:x1]
+    knowledge[...] = s["knowledge_next"][x0:x1]
+    peer_pressure = s["peer_pressure"][x0:x1]
+    benefits = np.clip(s["benefits"][x0:x1] + 0.1 * (peer_pressure - 0.5), -1, 1, out=s["benefits"][x0:x1])
+    barriers = np.clip(s["barriers"][x0:x1] - 0.1 * (peer_pressure - 0.5), -1, 1, out=s["barriers"][x0:x1])
+    susceptibility = np.clip(s["susceptibility"][x0:x1] + 0.1 * knowledge, -1, 1, out=s["susceptibility"][x0:x1])
+    severity = np.clip(s["severity"][x0:x1] + 0.1 * knowledge, -1, 1, out=s["severity"][x0:x1])
+    hb = (susceptibility + severity) / 2 - (benefits + barriers) / 2
+    s["behavior"][x0:x1] = hb > 0
+
+def _shutdown(pool):
+    pool.terminate()
+    pool.join()
+
+
+class TiledEngine(VectorizedEngine):
+    # VectorizedEngine whose citizen rules run strip by strip in a process pool
+    PHASES = ["move authorities", "interact", "authority familiarity", "health belief"]
+
+    def __init__(self, model, workers=None, tiles=None):
+        super().__init__(model) # same draws as the vectorized engine
+        self.start(workers, tiles)
+
+    def start(self, workers=None, tiles=None):
+        # move the state into shared memory and start the pool; also used by snapshot.load_snapshot
+        # workers defaults to every core, tiles (strips) to one per worker
+        self.workers = workers or os.cpu_count() or 1
+        ctx = multiprocessing.get_context()
+        width, height = self.knowledge.shape
+        arrays = {name: getattr(self, name) for name in STATE}
+        arrays["authority_layer"] = self.authorities.layer
+        arrays["peer_counts"] = self.memory.peer_counts
+        blocks = {}
+        for name, data in arrays.items():
+            blocks[name], view = shared_array(ctx, data.shape, data.dtype, data)
+            setattr(self, name, view)
+        # the index and the familiarity store keep working in place on the shared copies
+        self.authorities.layer = self.authority_layer
+        self.memory.peer_counts = self.peer_counts
+        for name, shape, dtype in (("knowledge_next", (width, height), float),
+                                   ("peer_pressure", (width, height), float),
+                                   ("keys", (width, height, 8), float)):
+            blocks[name], view = shared_array(ctx, shape, dtype)
+            setattr(self, name, view)
+
+        self.bounds = strips(width, tiles or self.workers)
+        specs = {name: (block, getattr(self, name).shape, getattr(self, name).dtype) for name, block in blocks.items()}
+        self.pool = ctx.Pool(self.workers, initializer=_attach, initargs=(specs, self.streams))
+        self._finalizer = weakref.finalize(self, _shutdown, self.pool)
+
+    def close(self):
+        # stop the workers; the model can still be read (reporters, snapshots) but not stepped
+        self._finalizer()
+
+    def step(self):
+        profiler = self.model.profiler
+        n = self.behavior.size
+        with profiler.phase("move authorities", len(self.authorities)):
+            self.move_authorities() # updates the shared occupancy layer in place
+        with profiler.phase("interact", n):
+            if self.streams is None:
+                self.rng.random(out=self.keys) # same draws as interaction_keys()
+            talks = self.pool.map(_interact, [(bounds, self.model.steps) for bounds in self.bounds], chunksize=1)
+        with profiler.phase("authority familiarity"):
+            # strips come back in x order, so citizens are in the same order as the vectorized engine
+            heard = np.concatenate([citizens for citizens, _ in talks])
+            authorities = np.concatenate([authorities for _, authorities in talks])
+            familiarity = self.memory.bump(heard, authorities)
+            self.knowledge_next.reshape(-1)[heard] += self.authority_reliability[authorities] * familiarity
+        with profiler.phase("health belief", n):
+            self.pool.map(_health_belief, self.bounds, chunksize=1)
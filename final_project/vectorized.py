@@ -0,0 +1,171 @@
+import numpy as np
+from reporters import REPORTERS
+from spatial import AuthorityIndex, MOORE_OFFSETS
+from streams import keyed_authorities, keyed_citizens
+
+def neighbor_views(arr, fill):
+    # stack the 8 moore-shifted copies of a (..., width, height) array -> (..., width, height, 8)
+    # cells off the edge of the (non-toroidal) grid get the fill value
+    width, height = arr.shape[-2:]
+    pad = [(0, 0)] * (arr.ndim - 2) + [(1, 1), (1, 1)]
+    padded = np.pad(arr, pad, constant_values=fill)
+    return np.stack([
+        padded[..., 1 + dx:1 + dx + width, 1 + dy:1 + dy + height]
+        for dx, dy in MOORE_OFFSETS
+    ], axis=-1)
+
+def pick_slot(mask, keys):
+    # choose one True slot per cell uniformly at random (-1 where a cell has no True slots)
+    slot = np.argmax(np.where(mask, keys, -1.0), axis=-1)
+    return np.where(mask.any(axis=-1), slot, -1)
+
+def take_slot(views, slot):
+    # read the value stored in the chosen slot of each cell
+    return np.take_along_axis(views, np.maximum(slot, 0)[..., None], axis=-1)[..., 0]
+
+def movement_draws(count, rng, movement, streams=None, step=0):
+    # every random number one step of authority movement uses, in the order Authority.move-style
+    # movement draws them: (visiting order, (count, 8, 2) moore offsets in the order each authority
+    # tries them) for sequential movement, ((count, 8) keys, (count,) priority) for batched.
+    # with streams (draws="keyed") every draw is keyed by (step, authority index) instead of taken from rng
+    ids = np.arange(count)
+    if movement == "batched":
+        if streams is None:
+            return rng.random((count, 8)), rng.random(count)
+        return streams.uniform(step, ids, "move", 8), streams.uniform(step, ids, "priority")
+    if streams is None:
+        order = rng.permutation(count)
+        # same draws as rng.permutation(MOORE_OFFSETS) once per visit, in one call; the j-th
+        # draw belongs to the j-th authority visited
+        offsets = np.empty((count, 8, 2), dtype=MOORE_OFFSETS.dtype)
+        offsets[order] = MOORE_OFFSETS[rng.permuted(np.tile(np.arange(8), (count, 1)), axis=1)]
+        return order, offsets
+    keys = streams.uniform(step, ids, "move", 8)
+    return streams.order(step, ids, "order"), MOORE_OFFSETS[np.argsort(keys, axis=1, kind="stable")]
+
+def move_authorities(authorities, rng, movement, streams=None, step=0):
+    # move every authority in an AuthorityIndex one step, returns the indices of the ones that moved
+    draws = movement_draws(len(authorities), rng, movement, streams, step)
+    if movement == "batched":
+        keys, priority = draws
+        return authorities.move_batched(rng, keys=keys, priority=priority)
+    # same rule as Authority.move: random free moore cell, authorities visited in random order
+    width, height = authorities.layer.shape
+    order, offsets = draws
+    moved = []
+    for i in order:
+        for nx, ny in (offsets[i] + authorities.pos[i]).tolist():
+            if 0 <= nx < width and 0 <= ny < height and authorities.is_free((nx, ny)):
+                authorities.move(i, (nx, ny))
+                moved.append(i)
+                break
+    return np.array(moved, dtype=np.int64)
+
+class VectorizedEngine:
+    # array-backed version of the citizen/authority rules in agents.py
+    # every citizen updates at once from the previous step's state (synchronous update),
+    # so runs match the per-agent engine statistically rather than draw-for-draw
+    PHASES = ["move authorities", "peer pressure", "adjust knowledge", "health belief"] # as timed in step
+    def __init__(self, model):
+        self.model = model
+        self.rng = model.rng
+        self.streams = model.streams # None unless draws="keyed"
+        width, height = model.width, model.height
+        shape = (width, height)
+
+        # citizen state, one citizen per cell indexed [x, y] like the grid
+        if self.streams is None:
+            draws = self.rng.uniform(-1, 1, size=(5,) + shape)
+        else:
+            draws = keyed_citizens(self.streams, shape)
+        self.susceptibility, self.severity, self.benefits, self.barriers, self.knowledge = draws
+        self.behavior = self.knowledge > 0 # initializes based on knowledge at start
+
+        # memory lives in model.familiarity, rows indexed by the flattened cell x * height + y
+        self.memory = model.familiarity
+        self.in_bounds = neighbor_views(np.ones(shape, dtype=bool), False)
+
+        # authorities: positions in the model's occupancy index, reliability by index
+        num_authorities = int(model.authority_density * width * height)
+        low, high = model.reliability_range
+        if self.streams is None:
+            cells = self.rng.permutation(width * height)[:num_authorities]
+        else:
+            cells, reliability = keyed_authorities(self.streams, width, height, num_authorities, low, high)
+        self.authorities = AuthorityIndex(width, height, np.stack(np.unravel_index(cells, shape), axis=-1))
+        model.authority_index = self.authorities
+        if self.streams is None:
+            reliability = self.rng.uniform(low, high, size=num_authorities)
+        self.authority_reliability = reliability
+
+    # reporters
+    def means(self):
+        # every reporter at once, for CitizenReporters
+        values = (self.knowledge, self.behavior, self.net_hb())
+        return {name: np.mean(v) for name, v in zip(REPORTERS, values)}
+    def net_hb(self):
+        return (self.susceptibility + self.severity) / 2 - (self.benefits + self.barriers) / 2
+
+    def move_authorities(self):
+        move_authorities(self.authorities, self.rng, self.model.authority_movement, self.streams, self.model.steps)
+
+    def interaction_keys(self):
+        # random keys that pick each citizen's authority or peer slot this step
+        if self.streams is None:
+            return self.rng.random(self.in_bounds.shape)
+        citizens = np.arange(self.behavior.size) # ids are flat cells, x * height + y
+        return self.streams.uniform(self.model.steps, citizens, "interact", 8).reshape(self.in_bounds.shape)
+
+    def authority_layer(self):
+        # authority index in every cell (-1 if none), the index into authority_reliability
+        return self.authorities.layer
+
+    def adjust_knowledge(self):
+        # each citizen talks to one random neighboring authority, or else one random peer
+        keys = self.interaction_keys()
+        authority_views = neighbor_views(self.authority_layer(), -1)
+        authority_slot = pick_slot(authority_views >= 0, keys)
+        peer_slot = pick_slot(self.in_bounds, keys)
+        knowledge = self.knowledge.copy()
+
+        # authority interactions
+        heard = authority_slot >= 0
+        authorities = take_slot(authority_views, authority_slot)[heard]
+        familiarity = self.memory.bump(np.flatnonzero(heard), authorities)
+        knowledge[heard] += self.authority_reliability[authorities] * familiarity
+
+        # peer interactions: knowledge moves toward the interlocutor's side of zero
+        talked = ~heard & (peer_slot >= 0)
+        familiarity = self.memory.bump_peers(np.flatnonzero(talked), peer_slot[talked])
+        interlocutor = take_slot(neighbor_views(self.knowledge, 0.0), peer_slot)[talked]
+        own = self.knowledge[talked]
+        sign = np.where((interlocutor > 0) & (own != 0), 1, -1)
+        knowledge[talked] += sign * 0.1 * familiarity
+
+        self.knowledge = knowledge
+
+    def peer_pressure(self):
+        # ratio of behaving to non-behaving peers, or the behaving count if every peer behaves
+        behaved = (neighbor_views(self.behavior, False) & self.in_bounds).sum(axis=-1)
+        not_behaved = self.in_bounds.sum(axis=-1) - behaved
+        return np.where(not_behaved > 0, behaved / np.maximum(not_behaved, 1), behaved)
+
+    def adjust_health_belief(self, peer_pressure):
+        self.benefits = np.clip(self.benefits + 0.1 * (peer_pressure - 0.5), -1, 1)
+        self.barriers = np.clip(self.barriers - 0.1 * (peer_pressure - 0.5), -1, 1)
+        self.susceptibility = np.clip(self.susceptibility + 0.1 * self.knowledge, -1, 1)
+        self.severity = np.clip(self.severity + 0.1 * self.knowledge, -1, 1)
+        return self.net_hb()
+
+    def step(self):
+        profiler = self.model.profiler
+        n = self.behavior.size
+        with profiler.phase("move authorities", len(self.authorities)):
+            self.move_authorities()
+        with profiler.phase("peer pressure", n):
+            peer_pressure = self.peer_pressure() # uses behavior from the start of the step
+        with profiler.phase("adjust knowledge", n):
+            self.adjust_knowledge()
+        with profiler.phase("health belief", n):
+            hb = self.adjust_health_belief(peer_pressure)
+            self.behavior = hb > 0
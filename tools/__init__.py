@@ -0,0 +1 @@
+# Tooling shared by the A1 and final_project models (see the repository README)
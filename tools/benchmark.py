@@ -0,0 +1,169 @@
+import argparse
+import importlib
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+import numpy as np
+
+# Performance benchmarks for CommunityModel (final_project) and SugarScapeModel (A1).
+#
+# Every case runs in its own fresh process, so peak RSS belongs to that case alone and one
+# case's caches do not warm up the next. A case builds the model with profile=True (the
+# shared profiler in tools/step_profiler.py), runs a few warm-up steps, then times every step.
+# It reports steps/sec, step latency percentiles, construction time, peak RSS, and the share
+# of step time spent in data collection (reporter cost).
+#
+#     python tools/benchmark.py run --suite quick --out baseline.json
+#     ... change things ...
+#     python tools/benchmark.py run --suite quick --out current.json
+#     python tools/benchmark.py compare baseline.json current.json --threshold 0.10
+#
+# compare exits with status 1 when any case lost more than `threshold` of its throughput.
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def community(steps, **params):
+    return {"project": "final_project", "model": "CommunityModel", "steps": steps, "params": params}
+
+def sugarscape(steps, **params):
+    return {"project": "A1", "model": "SugarScapeModel", "steps": steps, "params": params}
+
+SUITES = {
+    # a couple of minutes in total, for checking a change before committing
+    "quick": [
+        community(20, width=50, height=50, authority_density=0.0),
+        community(20, width=50, height=50, authority_density=0.1),
+        community(50, width=200, height=200, authority_density=0.1, engine="vectorized"),
+        sugarscape(50, initial_population=200, vision_max=5),
+        sugarscape(50, initial_population=1000, vision_max=5, movement="vectorized"),
+    ],
+    # grid sizes from 50 x 50 to 1000 x 1000 and several densities, populations and visions
+    "full": [
+        *[community(20, width=size, height=size, authority_density=density)
+          for size in (50, 100, 200) for density in (0.0, 0.1, 0.25)],
+        *[community(30, width=size, height=size, authority_density=density, engine="vectorized")
+          for size in (50, 200, 500, 1000) for density in (0.0, 0.1, 0.25)],
+        community(30, width=500, height=500, authority_density=0.25, engine="vectorized",
+                  authority_movement="batched"),
+        *[sugarscape(100, initial_population=population, vision_max=vision, movement=movement)
+          for population in (200, 1000, 2000) for vision in (5, 10) for movement in ("agents", "vectorized")],
+        *[sugarscape(100, initial_population=population, vision_max=vision, phases="fused", regrow_mode="dirty")
+          for population in (1000, 2000) for vision in (5, 10)],
+    ],
+}
+
+def case_name(case):
+    params = ",".join(f"{k}={v}" for k, v in case["params"].items())
+    return f"{case['model']}[{params}]"
+
+
+def _run_case(case):
+    # runs in a fresh process: import the project's model, build it, time its steps
+    sys.path.insert(0, str(ROOT / case["project"]))
+    model_cls = getattr(importlib.import_module("model"), case["model"])
+    start = time.perf_counter()
+    model = model_cls(**case["params"], profile=True)
+    construct = time.perf_counter() - start
+    for _ in range(min(2, case["steps"])): # warm-up steps, not timed
+        model.step()
+    collect_before = model.profiler.totals.get("collect", [0.0])[0]
+    latencies = []
+    while model.running and len(latencies) < case["steps"]:
+        start = time.perf_counter()
+        model.step()
+        latencies.append(time.perf_counter() - start)
+    collect = model.profiler.totals.get("collect", [0.0])[0] - collect_before
+    latencies = np.array(latencies)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024)
+    return {
+        "name": case_name(case),
+        **case,
+        "steps_run": len(latencies),
+        "construct_s": construct,
+        "steps_per_s": len(latencies) / latencies.sum(),
+        "latency_ms": {f"p{q}": float(np.percentile(latencies, q)) * 1e3 for q in (50, 90, 99)},
+        "peak_rss_mb": rss,
+        "reporter_share": collect / latencies.sum(),
+    }
+
+def run_suite(cases, display_progress=True):
+    context = multiprocessing.get_context("spawn") # nothing inherited from the parent or other cases
+    results = []
+    for i, case in enumerate(cases, start=1):
+        with context.Pool(1) as pool:
+            result = pool.apply(_run_case, (case,))
+        results.append(result)
+        if display_progress:
+            print(f"[{i}/{len(cases)}] {result['name']}: {result['steps_per_s']:.2f} steps/s, "
+                  f"p50 {result['latency_ms']['p50']:.1f} ms, p99 {result['latency_ms']['p99']:.1f} ms, "
+                  f"{result['peak_rss_mb']:.0f} MB, reporters {result['reporter_share']:.1%}")
+    return results
+
+def environment():
+    # what the numbers were measured on, so baselines from different machines are not mixed up
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    import mesa
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "mesa": mesa.__version__, "machine": platform.machine(), "node": platform.node()}
+
+def compare(baseline, current, threshold=0.10):
+    # throughput change per case present in both files; returns the cases that regressed
+    before = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    print(f"baseline {baseline['environment'].get('commit')} -> current {current['environment'].get('commit')}")
+    for result in current["results"]:
+        old = before.get(result["name"])
+        if old is None:
+            print(f"  new      {result['name']}: {result['steps_per_s']:.2f} steps/s")
+            continue
+        change = result["steps_per_s"] / old["steps_per_s"] - 1
+        flag = "REGRESSED" if change < -threshold else "ok"
+        print(f"  {flag:9} {result['name']}: {old['steps_per_s']:.2f} -> {result['steps_per_s']:.2f} steps/s "
+              f"({change:+.1%}), p99 {old['latency_ms']['p99']:.1f} -> {result['latency_ms']['p99']:.1f} ms, "
+              f"rss {old['peak_rss_mb']:.0f} -> {result['peak_rss_mb']:.0f} MB")
+        if change < -threshold:
+            regressions.append(result["name"])
+    if baseline["environment"].get("node") != current["environment"].get("node"):
+        print("  (measured on different machines, differences may not be regressions)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark CommunityModel and SugarScapeModel.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run a benchmark suite and save the results as JSON")
+    run.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    run.add_argument("--match", default=None, help="only run cases whose name contains this text")
+    run.add_argument("--out", default=None, help="JSON file to write (default benchmark-<suite>.json)")
+    check = commands.add_parser("compare", help="compare two JSON results and flag throughput regressions")
+    check.add_argument("baseline")
+    check.add_argument("current")
+    check.add_argument("--threshold", type=float, default=0.10, help="allowed throughput loss (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        cases = [c for c in SUITES[args.suite] if args.match is None or args.match in case_name(c)]
+        output = {"suite": args.suite, "environment": environment(), "results": run_suite(cases)}
+        out = Path(args.out or f"benchmark-{args.suite}.json")
+        out.write_text(json.dumps(output, indent=2))
+        print(f"wrote {out}")
+        return 0
+    baseline, current = (json.loads(Path(p).read_text()) for p in (args.baseline, args.current))
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+import numpy as np
+
+# Counter-based random streams shared by the draws="keyed" mode of both models (each project's
+# streams.py subclasses RandomStreams with its own PURPOSES). Every number is a pure function of
+# (seed, step, id, purpose, k) instead of the next value of one sequential generator, so a draw
+# doesn't depend on which agents drew before it, what order they ran in or which process
+# computed it. Each (seed, purpose, step) is its own numpy Philox stream, keyed by
+# (seed % 2**64, PURPOSES[purpose]) with the step in the last counter word (Philox is
+# counter-based: the key and counter fully determine the output, and it can jump ahead for
+# free); id i owns positions i * size ... (i + 1) * size of that stream
+
+class RandomStreams:
+    purposes = {} # purpose name -> key word, set by each project's subclass
+
+    def __init__(self, seed):
+        self.seed = int(seed)
+
+    def generator(self, step, purpose, start=0):
+        # numpy Generator for one (step, purpose) stream, positioned at its start-th double
+        key = np.array([self.seed % 2**64, self.purposes[purpose]], dtype=np.uint64)
+        bit_generator = np.random.Philox(key=key, counter=[0, 0, 0, step])
+        bit_generator.advance(start // 4) # advance counts blocks of four doubles
+        generator = np.random.Generator(bit_generator)
+        generator.random(start % 4)
+        return generator
+
+    def uniform(self, step, ids, purpose, size=None):
+        # doubles in [0, 1): one per id, or (len(ids), size) with size draws per id
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        count = 1 if size is None else size
+        values = np.empty((0, count))
+        if len(ids):
+            lo, hi = int(ids.min()), int(ids.max()) + 1
+            values = self.generator(step, purpose, lo * count).random((hi - lo, count))[ids - lo]
+        return values[:, 0] if size is None else values
+
+    def order(self, step, ids, purpose):
+        # random permutation of positions in ids, the keyed version of shuffling them
+        return np.argsort(self.uniform(step, ids, purpose), kind="stable")
+
+    def integers(self, step, ids, purpose, low, high):
+        # integers in [low, high] (both ends included), one per id
+        return low + np.floor(self.uniform(step, ids, purpose) * (high - low + 1)).astype(np.int64)
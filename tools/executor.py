@@ -0,0 +1,146 @@
+import importlib
+import itertools
+import sys
+from multiprocessing import Pool, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Process-pool executor for CommunityModel (final_project) and SugarScapeModel (A1) sweeps.
+#
+# mesa.batch_run starts fresh work for every run and pickles every step's reporter dict back
+# to the parent. Here the workers are started once, import the project's model module once,
+# and run many jobs each. Every job writes its reporter time series straight into one
+# shared-memory array of shape (jobs, steps + 1, 1 + reporters), column 0 holding the step each
+# row was collected at; only the job number and row count travel back through the pool. Jobs are handed out most expensive first (grid cells
+# x steps by default) so one long run does not end up alone at the tail of the sweep.
+#
+# Both projects have a model.py, so an executor is bound to one project directory. The pool
+# stays up until the executor is closed, so several sweeps can share the same warm workers:
+#     with SweepExecutor("final_project", "CommunityModel") as executor:
+#         results = executor.run({"seed": range(10), "authority_density": [0.0, 0.1]}, max_steps=300)
+#     df = results.to_frame()
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_REPORTERS = {
+    "CommunityModel": ["Mean Knowledge", "Mean Behavior", "Net Health Belief"],
+    "SugarScapeModel": ["Gini", "Metabolism", "Sugar", "NumAgents"],
+}
+
+def expand(parameters):
+    # cartesian product of every list-valued parameter, like mesa.batch_run
+    names = list(parameters)
+    values = [v if isinstance(v, (list, tuple, range)) else [v] for v in parameters.values()]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+def grid_cost(run, max_steps):
+    # expected cost of a run: grid cells x steps (50 x 50 is the default grid of both models)
+    return run.get("width", 50) * run.get("height", 50) * max_steps
+
+
+# worker side: state kept for the life of the worker process
+_worker = {}
+
+def _init_worker(project, class_name):
+    sys.path.insert(0, str(project))
+    _worker["model_cls"] = getattr(importlib.import_module("model"), class_name) # imported once per worker
+
+def _output(shm_name, shape):
+    # attach to the current sweep's shared block (the parent creates and unlinks it)
+    if _worker.get("shm_name") != shm_name:
+        if "shm" in _worker:
+            _worker["shm"].close()
+        _worker["shm"] = SharedMemory(name=shm_name)
+        _worker["shm_name"] = shm_name
+        _worker["data"] = np.ndarray(shape, dtype=np.float64, buffer=_worker["shm"].buf)
+    return _worker["data"]
+
+def collected_steps(rows, period, final_step):
+    # step of each collected row for a model that doesn't report its own Step: every period-th
+    # step from 0, plus the last step if the run stopped (running = False) off-period
+    steps = np.arange(rows) * period
+    if rows and final_step % period and rows == final_step // period + 2:
+        steps[-1] = final_step
+    return steps
+
+def _run_job(job):
+    index, run, max_steps, shm_name, shape, reporters = job
+    data = _output(shm_name, shape)
+    model = _worker["model_cls"](**run)
+    while model.running and model.steps < max_steps:
+        model.step()
+    model_vars = model.datacollector.model_vars
+    rows = min(len(next(iter(model_vars.values()))), shape[1])
+    if "Step" in model_vars: # CommunityModel records it whenever collection_period != 1
+        data[index, :rows, 0] = np.asarray(model_vars["Step"][:rows], dtype=np.float64)
+    else:
+        data[index, :rows, 0] = collected_steps(rows, run.get("collection_period", 1), model.steps)
+    for k, name in enumerate(reporters, start=1):
+        data[index, :rows, k] = np.asarray(model_vars[name][:rows], dtype=np.float64)
+    return index, rows
+
+
+class SweepResults:
+    # reporter time series for every run: data[run, row, 1 + reporter], valid up to lengths[run];
+    # data[run, row, 0] is the step the row was collected at
+    def __init__(self, runs, reporters, data, lengths):
+        self.runs = runs
+        self.reporters = reporters
+        self.data = data
+        self.lengths = lengths
+
+    def to_frame(self):
+        # long DataFrame with one row per collected step, like mesa.batch_run output
+        frames = []
+        for i, run in enumerate(self.runs):
+            rows = self.lengths[i]
+            df = pd.DataFrame(self.data[i, :rows, 1:], columns=self.reporters)
+            if "Step" not in df:
+                df.insert(0, "Step", self.data[i, :rows, 0].astype(np.int64))
+            df.insert(0, "RunId", i)
+            for name, value in run.items():
+                df[name] = value
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
+
+
+class SweepExecutor:
+    def __init__(self, project, class_name, reporters=None, processes=None, cost=grid_cost):
+        self.project = (ROOT / project).resolve()
+        self.class_name = class_name
+        self.reporters = list(reporters or DEFAULT_REPORTERS[class_name])
+        self.cost = cost
+        # start the tracker first so workers share it instead of each starting their own, which
+        # would report the parent's shared blocks as leaked when the workers exit
+        resource_tracker.ensure_running()
+        self.pool = Pool(processes, initializer=_init_worker, initargs=(self.project, class_name))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def run(self, parameters, max_steps=300, display_progress=True):
+        runs = expand(parameters)
+        shape = (len(runs), max_steps + 1, 1 + len(self.reporters)) # step 0 is collected in __init__
+        shm = SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+        try:
+            data = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+            data.fill(np.nan)
+            lengths = np.zeros(len(runs), dtype=np.int64)
+            jobs = sorted(((i, run, max_steps, shm.name, shape, self.reporters) for i, run in enumerate(runs)),
+                          key=lambda job: self.cost(job[1], max_steps), reverse=True)
+            for done, (index, rows) in enumerate(self.pool.imap_unordered(_run_job, jobs), start=1):
+                lengths[index] = rows
+                if display_progress:
+                    print(f"[{done}/{len(jobs)}] run {index} {runs[index]}: {rows} rows")
+            return SweepResults(runs, self.reporters, data.copy(), lengths)
+        finally:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,137 @@
+import time
+import tracemalloc
+from contextlib import nullcontext
+import pandas as pd
+
+# Opt-in step profiling, shared by CommunityModel and SugarScapeModel (each project's
+# profiling.py re-exports this module). The model wraps each phase of its step in
+# profiler.phase(name, agents); with profiling off that is NULL_PROFILER, whose phase() hands
+# back one shared no-op context, so the only cost is a method call per phase. With profiling on, every phase records wall
+# time, calls and agents processed, each step's values become DataCollector columns
+# ("<phase> Time", "Step Time", ...) and profiler.summary() totals the whole run.
+# With allocations=True tracemalloc also records the peak memory allocated during each step
+# (this slows the model down a lot, so it is only for hunting allocations). Tracing that the
+# profiler started is stopped again by close(), which summary() calls.
+# The model times its data collection as a "collect" phase, but collection reads the row's
+# values before it finishes, so that time shows up in summary() totals only, never in a row.
+
+class NullProfiler:
+    enabled = False
+    _context = nullcontext()
+
+    def phase(self, name, agents=0):
+        return self._context
+
+    def start_step(self):
+        pass
+
+    def end_step(self):
+        pass
+
+    def close(self):
+        pass
+
+NULL_PROFILER = NullProfiler()
+
+
+class _Phase:
+    # context manager timing one phase, reused for every call of that phase
+    __slots__ = ("profiler", "name", "agents", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start, self.agents)
+
+
+class StepProfiler:
+    enabled = True
+
+    def __init__(self, phases, allocations=False):
+        self.phases = list(phases) # phases that get their own DataCollector column
+        self.allocations = allocations
+        self.contexts = {}
+        self.totals = {} # phase -> [seconds, calls, agents] over the whole run
+        self.current = {} # phase -> seconds in the current (last finished) step
+        self.step_times = []
+        self.step_allocs = []
+        self.tracing = allocations and not tracemalloc.is_tracing() # True if this profiler started it
+        if self.tracing:
+            tracemalloc.start()
+
+    def phase(self, name, agents=0):
+        context = self.contexts.get(name)
+        if context is None:
+            context = self.contexts[name] = _Phase(self, name)
+        context.agents = agents
+        return context
+
+    def record(self, name, seconds, agents):
+        total = self.totals.get(name)
+        if total is None:
+            total = self.totals[name] = [0.0, 0, 0]
+        total[0] += seconds
+        total[1] += 1
+        total[2] += agents
+        self.current[name] = self.current.get(name, 0.0) + seconds
+
+    def start_step(self):
+        self.current = {}
+        if self.allocations and tracemalloc.is_tracing():
+            self.alloc_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+    def end_step(self):
+        self.step_times.append(sum(self.current.values()))
+        if self.allocations and tracemalloc.is_tracing():
+            self.step_allocs.append(tracemalloc.get_traced_memory()[1] - self.alloc_start)
+
+    def close(self):
+        # stop the tracing this profiler started, so later runs in the process aren't slowed down;
+        # steps after this are still timed, just without allocations
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
+
+    def model_reporters(self):
+        # one column per declared phase, plus the step total (collection itself is not included,
+        # it runs after the row's values are read; see summary() for its cost)
+        reporters = {f"{name} Time": (lambda model, name=name: model.profiler.current.get(name, 0.0))
+                     for name in self.phases}
+        reporters["Step Time"] = lambda model: model.profiler.step_times[-1] if model.profiler.step_times else 0.0
+        if self.allocations:
+            reporters["Step Alloc KB"] = lambda model: model.profiler.step_allocs[-1] / 1024 if model.profiler.step_allocs else 0.0
+        return reporters
+
+    def summary(self):
+        # totals for the run so far; also ends allocation tracing (see close)
+        self.close()
+        return ProfileSummary(self.totals, self.step_times, self.step_allocs)
+
+
+class ProfileSummary:
+    # totals for a profiled run: seconds, calls and agents per phase
+    def __init__(self, totals, step_times, step_allocs):
+        self.totals = {name: tuple(values) for name, values in totals.items()}
+        self.steps = len(step_times)
+        self.step_times = list(step_times)
+        self.step_allocs = list(step_allocs)
+
+    def to_frame(self):
+        df = pd.DataFrame.from_dict(self.totals, orient="index", columns=["seconds", "calls", "agents"])
+        df.index.name = "phase"
+        df["per call ms"] = df["seconds"] / df["calls"] * 1e3
+        df["per agent us"] = (df["seconds"] / df["agents"].where(df["agents"] > 0)) * 1e6
+        df["share"] = df["seconds"] / df["seconds"].sum()
+        return df.sort_values("seconds", ascending=False)
+
+    def __str__(self):
+        text = f"{self.steps} steps, {sum(self.step_times):.3f}s in stepped phases\n{self.to_frame().to_string()}"
+        if self.step_allocs:
+            text += f"\npeak allocation per step: {max(self.step_allocs) / 1024:.1f} KB"
+        return text